@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Run consolidate_songs and generate_song_metadata in one process over a single lyrics scan."""
+
+import os
+import logging
+import time
+import argparse
+import sys
+
+from log_setup import setup_queue_logging
+from consolidate_songs import consolidate_songs, find_lyrics_files
+from generate_song_metadata import update_song_metadata
+
+def build(base_dir: str, output_file: str, metadata_file: str, verbose: bool = False) -> int:
+    """Walk base_dir once and update both the consolidated songs and the song metadata.
+
+    Returns the number of lyrics files found.
+    """
+    lyrics_files = list(find_lyrics_files(base_dir))
+    consolidate_songs(base_dir, output_file, lyrics_files=lyrics_files)
+    update_song_metadata(base_dir, metadata_file, verbose=verbose, lyrics_files=lyrics_files)
+    return len(lyrics_files)
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Consolidate lyrics and update song metadata from one directory scan')
+    parser.add_argument('--base-dir', default=os.path.join(script_dir, '..'),
+                        help='Base directory containing song folders')
+    parser.add_argument('--output', default=os.path.join(script_dir, 'consolidated_songs.yml'),
+                        help='Output file path for consolidated songs')
+    parser.add_argument('--metadata', default=os.path.join(script_dir, 'song_metadata.yml'),
+                        help='Output file path for song metadata')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Enable verbose logging')
+
+    args = parser.parse_args()
+
+    setup_queue_logging('build_all.log', level=logging.DEBUG if args.verbose else logging.INFO)
+
+    try:
+        base_dir = os.path.abspath(args.base_dir)
+        if not os.path.isdir(base_dir):
+            raise ValueError(f"Base directory {base_dir} does not exist")
+
+        start_time = time.time()
+
+        found = build(base_dir, os.path.abspath(args.output), os.path.abspath(args.metadata), verbose=args.verbose)
+
+        end_time = time.time()
+        logging.info(f"Processing completed for {found} lyrics files in {end_time - start_time:.2f} seconds")
+
+    except ValueError as ve:
+        logging.error(f"Validation error: {str(ve)}")
+        sys.exit(1)
+    except Exception as e:
+        logging.error(f"Fatal error: {str(e)}")
+        sys.exit(1)
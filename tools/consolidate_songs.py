@@ -1,147 +1,248 @@
 import os
 import yaml
-from yaml.representer import SafeRepresenter
-import logging
-from datetime import datetime
-import re
-
-# Track processed versions
-processed_versions = {}
-import time
 try:
-    from tqdm import tqdm
+    # Prefer the libyaml-backed C implementation when PyYAML was built with it
+    from yaml import CSafeDumper as SafeDumper
 except ImportError:
-    # Fallback if tqdm is not installed
-    def tqdm(iterable, *args, **kwargs):
-        return iterable
+    from yaml import SafeDumper
+import hashlib
+import io
+import json
+import logging
+import time
 import shutil
 import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import sys
 from pathlib import Path
+from typing import List, Optional
+from log_setup import setup_queue_logging
+from lyrics_scan import scan_lyrics_files
 
 def find_lyrics_files(base_dir):
-    """Find all lyrics files in the filesystem, handling all filename formats."""
-    lyrics_files = []
-    potential_lyrics_files = []  # For debug logging
+    """Yield all lyrics files in the filesystem, handling all filename formats.
+
+    Paths are produced lazily as the tree is scanned; callers that need to
+    iterate more than once should materialize the result with list().
+    """
+    found = 0
+    # Near-miss filenames are only gathered when they will actually be logged
+    potential_lyrics_files = [] if logging.getLogger().isEnabledFor(logging.DEBUG) else None
     logging.info(f"Searching for lyrics files in {base_dir}")
     
     try:
-        # Search all files recursively
-        for root, dirs, files in os.walk(base_dir):
-            # Skip the tools directory to avoid self-referential files
-            if "tools" in root.split(os.path.sep):
-                continue
-                
-            for file in files:
-                # Log potential lyrics files for debugging
-                if "lyric" in file.lower() or "song" in file.lower() or "text" in file.lower():
-                    potential_lyrics_files.append(os.path.join(root, file))
-                
-                # Fully case-insensitive matching for _lyrics.txt
-                if file.lower().endswith('_lyrics.txt'):
-                    # Skip the consolidated_songs_lyrics.txt file
-                    if file.lower() == "consolidated_songs_lyrics.txt":
-                        continue
-                        
-                    full_path = os.path.join(root, file)
-                    if os.path.isfile(full_path) and os.access(full_path, os.R_OK):
-                        lyrics_files.append(full_path)
-                        logging.info(f"Found valid lyrics file (_lyrics.txt): {full_path}")
+        for full_path in scan_lyrics_files(base_dir, potential_lyrics_files):
+            found += 1
+            logging.debug("Found valid lyrics file (_lyrics.txt): %s", full_path)
+            yield full_path
         
         # Log potential lyrics files that weren't included
-        for file_path in potential_lyrics_files:
-            if file_path not in lyrics_files:
-                logging.debug(f"Potential lyrics file not matching pattern: {file_path}")
+        for file_path in potential_lyrics_files or ():
+            logging.debug("Potential lyrics file not matching pattern: %s", file_path)
                 
         logging.debug(f"All directories searched")
     except Exception as e:
         logging.error(f"Error searching directory {base_dir}: {str(e)}")
         raise
     
-    logging.info(f"Found {len(lyrics_files)} valid lyrics files")
-    return lyrics_files
+    logging.info(f"Found {found} valid lyrics files")
+
+# Bound on each title cache below; the song watcher keeps this module loaded across builds,
+# so paths of deleted or renamed songs must eventually fall out
+TITLE_CACHE_SIZE = 8192
 
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
 def normalize_title(title):
     """
     Use directory name as-is with minimal normalization.
     Just normalize spacing to avoid leading/trailing whitespace issues.
     """
-    # Only normalize spacing
-    return ' '.join(title.split())
+    # Only normalize spacing; intern so repeated titles share one string object
+    return sys.intern(' '.join(title.split()))
+
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def get_song_title_from_file(file_path):
+    """Get the song title from the lyrics file's directory name (as-is).
+
+    Cached per path: the index build and the file read both need the title.
+    """
+    parts = file_path.rsplit(os.sep, 2)
+    dir_name = parts[-2] if len(parts) >= 2 else ""
+    # Only apply minimal normalization
+    return normalize_title(dir_name)
+
+def get_index_file(output_file):
+    """Return the path of the sidecar index kept next to the consolidated YAML file."""
+    return f"{os.path.splitext(output_file)[0]}.index.json"
+
+def build_song_index(lyrics_files):
+    """Build the change-detection index for the given lyrics files.
+
+    "songs" maps each song title to the lyrics file that provides it and that
+    file's mtime and size (content digests are added by fill_song_digests).
+    "fingerprint" is a digest of (path, mtime, size) for every
+    lyrics file, duplicates included, so any edit, addition or removal changes it.
+    """
+    songs = {}
+    stamps = []
+    for file_path in lyrics_files:
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            logging.debug(f"Could not stat {file_path}: {str(e)}")
+            continue
+        stamps.append(f"{file_path}:{stat.st_mtime_ns}:{stat.st_size}")
+        title = get_song_title_from_file(file_path)
+        if title not in songs:
+            songs[title] = {"path": file_path, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+    stamps.sort()
+    fingerprint = hashlib.blake2b("\n".join(stamps).encode("utf-8"), digest_size=16).hexdigest()
+    return {"fingerprint": fingerprint, "songs": songs}
+
+def fill_song_digests(song_index, previous_index):
+    """Add a content digest to every song in song_index.
+
+    Digests are reused from previous_index for files whose path, mtime and
+    size are unchanged, so only touched files are read and hashed.
+    """
+    previous_songs = (previous_index or {}).get("songs", {})
+    for title, entry in song_index["songs"].items():
+        previous = previous_songs.get(title)
+        if (previous and previous.get("digest") and previous.get("path") == entry["path"]
+                and previous.get("mtime") == entry["mtime"] and previous.get("size") == entry["size"]):
+            entry["digest"] = previous["digest"]
+            continue
+        try:
+            with open(entry["path"], "rb") as f:
+                entry["digest"] = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        except OSError as e:
+            logging.debug(f"Could not hash {entry['path']}: {str(e)}")
+            entry["digest"] = None
+
+def same_song_contents(song_index, previous_index):
+    """Check whether both indexes list the same titles with identical file contents."""
+    previous_songs = previous_index.get("songs", {})
+    songs = song_index["songs"]
+    if songs.keys() != previous_songs.keys():
+        return False
+    return all(entry["digest"] is not None and entry["digest"] == previous_songs[title].get("digest")
+               for title, entry in songs.items())
+
+def load_song_index(index_file):
+    """Load the song index written by the previous run, or None if unavailable."""
+    try:
+        with open(index_file, "r", encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.warning(f"Ignoring unreadable index {index_file}: {str(e)}")
+        return None
+    return index if isinstance(index, dict) else None
+
+def write_song_index(index_file, index):
+    """Write the song index used to detect changes on the next run."""
+    with open(index_file, "w", encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    logging.info(f"Updated index: {index_file}")
 
 def read_lyrics_file(file_path):
     """Read the lyrics file and return its content."""
     try:
-        # Validate file exists and is readable
-        if not os.path.isfile(file_path) or not os.access(file_path, os.R_OK):
-            raise ValueError(f"File {file_path} is not accessible")
-            
-        # Read file content with proper encoding
-        with open(file_path, "r", encoding='utf-8') as f:
-            lyrics = f.read().strip()
+        # Read the whole file in one call; a missing or unreadable file raises OSError
+        lyrics = Path(file_path).read_text(encoding='utf-8').strip()
         
-        # Get the title from the directory name (as-is)
-        dir_name = os.path.basename(os.path.dirname(file_path))
-        # Only apply minimal normalization
-        title = normalize_title(dir_name)
+        title = get_song_title_from_file(file_path)
         
-        logging.info(f"Processed {file_path} with title: {title}")
+        logging.debug("Processed %s with title: %s", file_path, title)
         
         return {
             "title": title,
             "lyrics": lyrics
         }
-    except (ValueError, UnicodeDecodeError) as e:
+    except (OSError, UnicodeDecodeError) as e:
         logging.error(f"Error reading {file_path}: {str(e)}")
         raise
     except Exception as e:
         logging.error(f"Unexpected error reading {file_path}: {str(e)}")
         raise
 
+_STR_TAG = 'tag:yaml.org,2002:str'
+
 def str_presenter(dumper, data):
     """Force block scalar style for multiline strings."""
-    if "\n" in data:
-        return dumper.represent_scalar('tag:yaml.org,2002:str', data, style='|')
-    return dumper.represent_scalar('tag:yaml.org,2002:str', data)
+    return dumper.represent_scalar(_STR_TAG, data, style='|' if "\n" in data else None)
 
-yaml.add_representer(str, str_presenter)
+yaml.add_representer(str, str_presenter, Dumper=SafeDumper)
 
-def consolidate_songs(base_dir: str = "..", output_file: str = "../consolidated_songs.yml", dry_run: bool = False):
-    """Consolidate all lyrics files into a single YAML file."""
-    lyrics_files = find_lyrics_files(base_dir)
-    
-    # Create backup of existing file if it exists and we're not in dry-run mode
-    if os.path.exists(output_file) and not dry_run:
-        backup_file = f"{output_file}.bak"
-        if os.path.exists(backup_file):
-            # If backup exists, remove it first
-            os.remove(backup_file)
+def create_backup(output_file, backup_file):
+    """Snapshot output_file as backup_file, hardlinking when the filesystem allows it."""
+    if os.path.exists(backup_file):
+        # If backup exists, remove it first
+        os.remove(backup_file)
+    try:
+        os.link(output_file, backup_file)
+    except OSError:
+        # No hardlink support (or cross-device): fall back to a full copy
         shutil.copy2(output_file, backup_file)
-        logging.info(f"Created backup: {backup_file}")
-        print(f"Backup created: {backup_file}")
+
+def consolidate_songs(base_dir: str = "..", output_file: str = "../consolidated_songs.yml", dry_run: bool = False,
+                      lyrics_files: Optional[List[str]] = None) -> int:
+    """Consolidate all lyrics files into a single YAML file.
+
+    Pass lyrics_files to reuse a scan the caller already made; otherwise the
+    base directory is scanned once here. Returns the number of lyrics files found.
+    """
+    # Materialize once: the list is used for the index, the reads and the summary
+    lyrics_files = list(find_lyrics_files(base_dir) if lyrics_files is None else lyrics_files)
+    
+    # Compare against the index from the previous run instead of re-parsing the YAML;
+    # any added, removed or modified lyrics file means the output must be regenerated
+    index_file = get_index_file(output_file)
+    song_index = build_song_index(lyrics_files)
+    output_exists = os.path.exists(output_file)
+    previous_index = load_song_index(index_file) if output_exists else None
+    if previous_index and previous_index.get("fingerprint") == song_index["fingerprint"]:
+        logging.info(f"{output_file} is up to date")
+        print(f"No changes detected in {output_file}")
+        return len(lyrics_files)
+    
+    # Files were touched: hash only the ones whose stat data changed, and skip the
+    # rewrite if every song's contents are still the same (e.g. a fresh checkout)
+    fill_song_digests(song_index, previous_index)
+    if previous_index and same_song_contents(song_index, previous_index):
+        if not dry_run:
+            write_song_index(index_file, song_index)
+        logging.info(f"{output_file} is up to date (lyrics contents unchanged)")
+        print(f"No changes detected in {output_file}")
+        return len(lyrics_files)
     
     # Initialize sets for tracking processed songs and versions
     processed_titles = set()
-    duplicates = {}  # Store paths for each duplicate title
+    duplicates = defaultdict(list)  # Store paths for each duplicate title
     
     # Process all files, including those in subdirectories
     # The consolidated_songs_lyrics.txt file is already filtered out in find_lyrics_files
     
     # Process files to get current songs
     current_songs = []
-    for file in lyrics_files:
+    # Reading is I/O-bound, so overlap the file reads and keep dedup single-threaded
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        pending = [(file, executor.submit(read_lyrics_file, file)) for file in lyrics_files]
+    
+    for file, future in pending:
         try:
-            logging.info(f"Processing file: {file}")
+            logging.debug("Processing file: %s", file)
             
             # Read lyrics file and get title
-            song_data = read_lyrics_file(file)
+            song_data = future.result()
             
             # Check for duplicates
             if song_data["title"] in processed_titles:
-                if song_data["title"] not in duplicates:
-                    duplicates[song_data["title"]] = []
                 duplicates[song_data["title"]].append(file)
-                logging.info(f"Found duplicate: {song_data['title']} at {file}")
+                logging.debug("Found duplicate: %s at %s", song_data["title"], file)
                 continue
             
             processed_titles.add(song_data["title"])
@@ -149,27 +250,15 @@ def consolidate_songs(base_dir: str = "..", output_file: str = "../consolidated_
         except Exception as e:
             logging.error(f"Error processing {file}: {str(e)}")
             continue
+    
+    logging.info("Processed %d files (%d unique songs, %d duplicate titles)",
+                 len(lyrics_files), len(current_songs), len(duplicates))
 
-    # Only regenerate if there are changes
-    if not os.path.exists(output_file):
-        songs = current_songs
+    songs = current_songs
+    if not output_exists:
         print(f"Creating {output_file} from {len(songs)} songs")
     else:
-        # Load existing songs
-        with open(output_file, "r", encoding='utf-8') as f:
-            existing_data = yaml.safe_load(f)
-            existing_songs = existing_data.get("songs", [])
-            
-        # Compare existing and current songs
-        existing_titles = {song["title"] for song in existing_songs}
-        current_titles = {song["title"] for song in current_songs}
-        
-        if existing_titles != current_titles:
-            songs = current_songs
-            print(f"Updating {output_file} with {len(songs)} songs")
-        else:
-            print(f"No changes detected in {output_file}")
-            return
+        print(f"Updating {output_file} with {len(songs)} songs")
 
     if songs:
         try:
@@ -177,8 +266,30 @@ def consolidate_songs(base_dir: str = "..", output_file: str = "../consolidated_
             songs.sort(key=lambda x: x["title"])
             
             if not dry_run:
-                with open(output_file, "w", encoding='utf-8') as f:
-                    yaml.dump({"songs": songs}, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                # Write to a new file and swap it in, so a hardlinked backup keeps the old contents
+                # Emit one song at a time rather than the whole {"songs": [...]} document,
+                # buffering in memory so the file gets a single write
+                # (already UTF-8 encoded, bypassing the text layer)
+                buf = io.BytesIO()
+                buf.write(b"songs:\n")
+                for song in songs:
+                    yaml.dump([song], buf, Dumper=SafeDumper, encoding='utf-8', default_flow_style=False, allow_unicode=True, sort_keys=False)
+                data = buf.getvalue()
+                if output_exists and Path(output_file).read_bytes() == data:
+                    # Same YAML as before (e.g. only whitespace around lyrics changed): no backup or write needed
+                    logging.info(f"{output_file} content is unchanged, skipping write")
+                else:
+                    # Create backup of existing file if it exists
+                    if output_exists:
+                        backup_file = f"{output_file}.bak"
+                        create_backup(output_file, backup_file)
+                        logging.info(f"Created backup: {backup_file}")
+                        print(f"Backup created: {backup_file}")
+                    tmp_file = f"{output_file}.tmp"
+                    with open(tmp_file, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp_file, output_file)
+                write_song_index(index_file, song_index)
             
             # Generate summary
             print("\nProcessing Summary:")
@@ -205,6 +316,8 @@ def consolidate_songs(base_dir: str = "..", output_file: str = "../consolidated_
         logging.warning("No valid songs found to consolidate")
         print("No valid songs found to consolidate.")
 
+    return len(lyrics_files)
+
 if __name__ == "__main__":
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Consolidate lyrics files into a YAML file')
@@ -219,15 +332,7 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
-    # Set up logging
-    logging.basicConfig(
-        level=logging.DEBUG if args.verbose else logging.INFO,
-        format='%(message)s',
-        handlers=[
-            logging.FileHandler('consolidate_songs.log'),
-            logging.StreamHandler()
-        ]
-    )
+    setup_queue_logging('consolidate_songs.log', level=logging.DEBUG if args.verbose else logging.INFO)
     
     try:
         # Validate paths
@@ -241,10 +346,10 @@ if __name__ == "__main__":
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
         start_time = time.time()
-        consolidate_songs(base_dir, output_file, args.dry_run)
+        file_count = consolidate_songs(base_dir, output_file, args.dry_run)
         end_time = time.time()
         
-        logging.info(f"Processing completed in {end_time - start_time:.2f} seconds")
+        logging.info(f"Processing completed for {file_count} lyrics files in {end_time - start_time:.2f} seconds")
         
     except ValueError as ve:
         logging.error(f"Validation error: {str(ve)}")
@@ -11,14 +11,28 @@
 
 import os
 import yaml
-from typing import Dict, List, Set, Optional
+try:
+    # Prefer the libyaml-backed C implementation when PyYAML was built with it
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import hashlib
 import logging
-import sys
 import shutil
+import sys
+from log_setup import setup_queue_logging
+from lyrics_scan import scan_lyrics_files
+
+def get_dir_name(file_path: str) -> str:
+    """Return the name of the directory containing file_path with a single split."""
+    parts = file_path.rsplit(os.sep, 2)
+    return parts[-2] if len(parts) >= 2 else ""
 
 def get_song_title_from_file(file_path: str) -> str:
     """Extract song title from file path using directory name."""
-    dir_name = os.path.basename(os.path.dirname(file_path))
+    dir_name = get_dir_name(file_path)
     
     # Skip the root directory
     if dir_name == ".":
@@ -27,14 +41,65 @@ def get_song_title_from_file(file_path: str) -> str:
     
     # Just normalize spaces for minimal normalization
     normalized = ' '.join(dir_name.split())  # Normalize spaces
-    logging.debug(f"Extracted title '{normalized}' from directory '{dir_name}' for file {file_path}")
+    logging.debug("Extracted title '%s' from directory '%s' for file %s", normalized, dir_name, file_path)
     return normalized
 
+def dump_tags(tags: Dict, output_file: str, backup_file: Optional[str] = None) -> bool:
+    """Serialize tags to UTF-8 YAML in memory and write the file in a single call.
+
+    Nothing is written (and no backup is made) when output_file already holds
+    exactly these bytes. Returns True if the file was written.
+    """
+    data = yaml.dump(tags, Dumper=SafeDumper, encoding='utf-8', default_flow_style=False, allow_unicode=True, sort_keys=False)
+    try:
+        with open(output_file, "rb") as f:
+            if f.read() == data:
+                logging.info(f"{output_file} is already up to date")
+                return False
+        exists = True
+    except FileNotFoundError:
+        exists = False
+    
+    # Hardlink the current file as the backup so output_file never goes missing; the
+    # swap below gives output_file a new inode and leaves the backup's contents alone
+    if backup_file and exists:
+        try:
+            if os.path.exists(backup_file):
+                os.remove(backup_file)
+            try:
+                os.link(output_file, backup_file)
+            except OSError:
+                # No hardlink support (or cross-device): fall back to a full copy
+                shutil.copy2(output_file, backup_file)
+            logging.info(f"Created backup of existing metadata file: {backup_file}")
+        except Exception as e:
+            logging.error(f"Failed to create backup: {str(e)}")
+    
+    # Write next to the target and swap it in, so a failed write never leaves a truncated file
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, output_file)
+    return True
+
 def write_tags(tags: Dict, output_file: str = "song_metadata.yml") -> None:
     """Write tags to YAML file."""
-    with open(output_file, "w") as f:
-        yaml.dump(tags, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-    logging.info(f"Metadata written to {output_file}")
+    if dump_tags(tags, output_file):
+        logging.info(f"Metadata written to {output_file}")
+
+# SimHash fingerprints closer than this many bits are treated as the same title
+SIMHASH_MAX_DISTANCE = 8
+
+def simhash(title: str) -> int:
+    """64-bit SimHash of the character trigrams in each word of title, ignoring case and punctuation."""
+    weights = [0] * 64
+    for word in title.casefold().replace('-', ' ').replace('_', ' ').split():
+        word = ''.join(c for c in word if c.isalnum())
+        for i in range(max(1, len(word) - 2) if word else 0):
+            h = int.from_bytes(hashlib.blake2b(word[i:i + 3].encode('utf-8'), digest_size=8).digest(), 'big')
+            for bit in range(64):
+                weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
 
 def compare_tags(existing_tags: Dict, new_tags: Dict) -> Dict:
     """Compare existing and new tags to find missing and new songs.
@@ -43,44 +108,92 @@ def compare_tags(existing_tags: Dict, new_tags: Dict) -> Dict:
     - missing_songs: List of songs present in metadata but missing from filesystem
     - new_songs: List of songs present in filesystem but not in metadata
     - restored_songs: List of songs whose metadata was restored from backup
+    - possible_renames: (missing song, new song) pairs whose titles are near-duplicates
     """
     result = {
         "missing_songs": [],
         "new_songs": [],
-        "restored_songs": []
+        "restored_songs": [],
+        "possible_renames": []
     }
     
-    existing_songs = set(existing_tags.get("songs", {}).keys())
-    new_songs = set(new_tags.get("songs", {}).keys())
+    # Dict key views support set operations directly
+    existing_songs = existing_tags.get("songs", {}).keys()
+    new_songs = new_tags.get("songs", {}).keys()
     
     # Find songs in filesystem but not in existing metadata
-    for song in new_songs:
-        if song not in existing_songs:
-            result["new_songs"].append(song)
-            logging.debug(f"New song found: {song}")
+    result["new_songs"] = sorted(new_songs - existing_songs)
+    if result["new_songs"]:
+        logging.debug("New songs found: %s", ", ".join(result['new_songs']))
     
     # Find songs in metadata but missing from filesystem
-    for song in existing_songs:
-        if song not in new_songs:
-            result["missing_songs"].append(song)
-            logging.debug(f"Song in metadata but not found in filesystem: {song}")
+    result["missing_songs"] = sorted(existing_songs - new_songs)
+    if result["missing_songs"]:
+        logging.debug("Songs in metadata but not found in filesystem: %s", ", ".join(result['missing_songs']))
+    
+    # A missing and a new song with near-identical titles is most likely a renamed folder
+    if result["missing_songs"] and result["new_songs"]:
+        new_hashes = [(simhash(song), song) for song in result["new_songs"]]
+        for song in result["missing_songs"]:
+            song_hash = simhash(song)
+            distance, match = min((bin(song_hash ^ new_hash).count("1"), new_song) for new_hash, new_song in new_hashes)
+            if distance < SIMHASH_MAX_DISTANCE:
+                result["possible_renames"].append((song, match))
     
     # Check if we restored songs from backup
-    for song in new_tags.get("songs", {}):
-        if "restored_from_backup" in new_tags["songs"][song]:
+    for song, song_data in new_tags.get("songs", {}).items():
+        # Remove this temporary marker
+        if song_data.pop("restored_from_backup", None):
             result["restored_songs"].append(song)
-            # Remove this temporary marker
-            del new_tags["songs"][song]["restored_from_backup"]
     
     return result
 
+# Parsed YAML keyed by path, with the (st_mtime_ns, st_size, st_ino) it was parsed at, so a
+# long-running caller such as the song watcher only re-parses files that changed on disk
+_yaml_cache: Dict[str, Tuple[int, int, int, Any]] = {}
+
+def load_yaml(path: str) -> Any:
+    """Parse a YAML file, reusing the previous parse while the file is unchanged.
+
+    Callers get their own deep copy, so mutating the result never leaks into the cache.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _yaml_cache.pop(path, None)
+        raise
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _yaml_cache.get(path)
+    if cached is not None and cached[:3] == key:
+        data = cached[3]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=SafeLoader)
+        _yaml_cache[path] = (*key, data)
+    return copy.deepcopy(data)
+
+# Per lyrics file: the (st_mtime_ns, st_size, st_ino) it was last read at and whether it had
+# any text, so a long-running caller only re-reads the files that changed since its last run
+_lyrics_file_cache: Dict[str, Tuple[int, int, int, bool]] = {}
+
+def has_lyrics(file_path: str) -> bool:
+    """Return whether file_path is non-empty UTF-8 text, reading it only when its stat changed."""
+    st = os.stat(file_path)
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _lyrics_file_cache.get(file_path)
+    if cached is not None and cached[:3] == key:
+        return cached[3]
+    with open(file_path, "r", encoding="utf-8") as f:
+        non_empty = bool(f.read())
+    _lyrics_file_cache[file_path] = (*key, non_empty)
+    return non_empty
+
 def load_backup_metadata(backup_path: str) -> Optional[Dict]:
     """Load backup song metadata from the specified path."""
     try:
-        with open(backup_path, "r") as f:
-            backup_tags = yaml.safe_load(f)
-            logging.info(f"Loaded backup metadata from {backup_path} with {len(backup_tags.get('songs', {}))} songs")
-            return backup_tags
+        backup_tags = load_yaml(backup_path)
+        logging.info(f"Loaded backup metadata from {backup_path} with {len(backup_tags.get('songs', {}))} songs")
+        return backup_tags
     except FileNotFoundError:
         logging.info(f"Backup metadata file {backup_path} not found")
         return None
@@ -88,59 +201,66 @@ def load_backup_metadata(backup_path: str) -> Optional[Dict]:
         logging.error(f"Error loading backup metadata from {backup_path}: {str(e)}")
         return None
 
-def generate_song_metadata(base_dir: str, output_file: str, dry_run: bool = False, verbose: bool = False) -> Dict:
-    """Generate song metadata from lyrics files."""
-    
-    logging.info(f"Searching for lyrics files in {os.path.abspath(base_dir)}")
-    
-    # Load existing song metadata
-    song_metadata_file = output_file
+def load_existing_metadata(song_metadata_file: str) -> Dict:
+    """Load the current song metadata, or an empty structure if the file doesn't exist."""
     try:
-        with open(song_metadata_file, "r") as f:
-            existing_tags = yaml.safe_load(f)
-            logging.info(f"Loaded existing metadata from {song_metadata_file} with {len(existing_tags.get('songs', {}))} songs")
+        existing_tags = load_yaml(song_metadata_file) or {"songs": {}}
+        logging.info(f"Loaded existing metadata from {song_metadata_file} with {len(existing_tags.get('songs', {}))} songs")
     except FileNotFoundError:
         logging.info(f"Metadata file {song_metadata_file} not found, creating new metadata")
         existing_tags = {"songs": {}}
+    return existing_tags
+
+# Fields every song entry must have, mapped to a factory for the default value given the song title
+REQUIRED_FIELDS = {
+    "actual_title": lambda title: title,
+    "status": lambda title: "deferred",
+    "tags": lambda title: [],
+    "notes": lambda title: [],
+    "ai_generated": lambda title: False,
+}
+
+def has_required_fields(song_data: Dict) -> bool:
+    """Check whether a song entry already has a non-null value for every required field."""
+    return isinstance(song_data, dict) and all(song_data.get(field) is not None for field in REQUIRED_FIELDS)
+
+def format_metadata_fields(song_data: Dict) -> str:
+    """Summarize the status, ai_generated and (non-empty) tags fields of a song for logging."""
+    return ", ".join(f"{k}={v}" for k, v in song_data.items()
+                     if k in ['status', 'ai_generated'] or k == 'tags' and v)
+
+def generate_song_metadata(base_dir: str, output_file: str, dry_run: bool = False, verbose: bool = False,
+                           existing_tags: Optional[Dict] = None, lyrics_files: Optional[List[str]] = None) -> Dict:
+    """Generate song metadata from lyrics files.
+
+    existing_tags is the already-loaded contents of output_file; when omitted
+    the file is loaded here. Pass lyrics_files to reuse a scan the caller
+    already made instead of walking base_dir again.
+    """
     
-    # Load backup metadata if available
-    backup_path = f"{output_file}.bak"
-    backup_tags = load_backup_metadata(backup_path)
-    if not backup_tags:
-        logging.info("No backup metadata available, using empty backup")
-        backup_tags = {"songs": {}}
-        
+    if lyrics_files is None:
+        logging.info(f"Searching for lyrics files in {os.path.abspath(base_dir)}")
+    
+    # Load existing song metadata
+    if existing_tags is None:
+        existing_tags = load_existing_metadata(output_file)
     
     # Get all lyrics files
-    lyrics_files = []
-    for root, dirs, files in os.walk(base_dir):
-        logging.debug(f"Scanning directory: {root}")
-        for file in files:
-            # Case-insensitive matching for _lyrics.txt
-            if file.lower().endswith("_lyrics.txt"):
-                # Skip the consolidated_songs_lyrics.txt file
-                if file.lower() == "consolidated_songs_lyrics.txt":
-                    continue
-                    
-                # Skip files in the tools directory
-                if "tools" in root.split(os.path.sep):
-                    continue
-                    
-                full_path = os.path.join(root, file)
-                lyrics_files.append(full_path)
-                logging.debug(f"Found lyrics file: {full_path}")
+    if lyrics_files is None:
+        lyrics_files = list(scan_lyrics_files(base_dir))
     
     logging.info(f"Found {len(lyrics_files)} lyrics files")
     
+    # Forget files that are gone since the last run, so the cache tracks the current tree
+    for stale in _lyrics_file_cache.keys() - set(lyrics_files):
+        del _lyrics_file_cache[stale]
+    
     # Process lyrics files
     current_songs = set()
     for file_path in lyrics_files:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            
-            if not lines:
-                logging.debug(f"Skipping empty file: {file_path}")
+            if not has_lyrics(file_path):
+                logging.debug("Skipping empty file: %s", file_path)
                 continue
             
             # Use directory name for song title extraction (consistent with consolidate_songs.py)
@@ -151,91 +271,79 @@ def generate_song_metadata(base_dir: str, output_file: str, dry_run: bool = Fals
                 continue
                 
             # Use directory name as the key
-            dir_name = os.path.basename(os.path.dirname(file_path))
+            dir_name = get_dir_name(file_path)
             current_songs.add(dir_name)
             
             if verbose:
-                logging.debug(f"Processing song directory: {dir_name}")
+                logging.debug("Processing song directory: %s", dir_name)
         except Exception as e:
             if verbose:
                 logging.error(f"Error processing {file_path}: {str(e)}")
     
+    existing_songs = existing_tags.get("songs", {})
+    
+    # Nothing to do when the same songs are on disk and every entry is already complete
+    if current_songs == existing_songs.keys() and all(has_required_fields(song_data) for song_data in existing_songs.values()):
+        logging.info(f"No changes needed in {output_file}")
+        return existing_tags
+    
     # Generate new tags
     new_tags = {"songs": {}}
+    new_songs = new_tags["songs"]
     
     # Copy existing tags for songs that still exist, preserving all properties
-    for title in existing_tags.get("songs", {}):
+    log_preserved = logging.getLogger().isEnabledFor(logging.DEBUG)
+    for title, song_data in existing_songs.items():
         if title in current_songs:
             # Preserve all existing metadata for this song
-            new_tags["songs"][title] = existing_tags["songs"][title].copy()
-            metadata_fields = ", ".join(f"{k}={v}" for k, v in existing_tags["songs"][title].items() 
-                                      if k in ['status', 'ai_generated'] or k == 'tags' and v)
-            logging.debug(f"Preserving existing metadata for: {title} [{metadata_fields}]")
+            new_songs[title] = song_data.copy()
+            if log_preserved:
+                logging.debug("Preserving existing metadata for: %s [%s]", title, format_metadata_fields(song_data))
+    
+    # Only songs on disk that the current metadata doesn't know about need more work
+    unmatched_songs = current_songs - existing_songs.keys()
     
     # Check if there are songs in backup but not in current metadata
-    for title in backup_tags.get("songs", {}):
-        if title in current_songs and title not in new_tags["songs"]:
-            # Song exists in backup but not in current metadata - restore from backup
-            new_tags["songs"][title] = backup_tags["songs"][title].copy()
-            # Add a marker that we'll use in the comparison and then remove
-            new_tags["songs"][title]["restored_from_backup"] = True
-            metadata_fields = ", ".join(f"{k}={v}" for k, v in backup_tags["songs"][title].items() 
-                                      if k in ['status', 'ai_generated'] or k == 'tags' and v)
-            logging.info(f"Restored metadata from backup for: {title} [{metadata_fields}]")
+    if unmatched_songs:
+        # Load backup metadata if available
+        backup_path = f"{output_file}.bak"
+        backup_tags = load_backup_metadata(backup_path)
+        if not backup_tags:
+            logging.info("No backup metadata available, using empty backup")
+            backup_tags = {"songs": {}}
+        
+        for title, song_data in backup_tags.get("songs", {}).items():
+            if title in unmatched_songs:
+                # Song exists in backup but not in current metadata - restore from backup
+                new_songs[title] = song_data.copy()
+                # Add a marker that we'll use in the comparison and then remove
+                new_songs[title]["restored_from_backup"] = True
+                logging.info("Restored metadata from backup for: %s [%s]", title, format_metadata_fields(song_data))
     
     # Add new songs
     new_songs_added = []
-    for title in current_songs:
-        if title not in new_tags["songs"]:
-            # Set default values for new songs
-            new_tags["songs"][title] = {
-                "actual_title": title,
-                "status": "deferred",
-                "tags": [],
-                "notes": [],
-                "ai_generated": False
-            }
-            new_songs_added.append(title)
-            logging.info(f"Adding new song to metadata with default values: {title}")
+    for title in sorted(unmatched_songs - new_songs.keys()):
+        # Set default values for new songs
+        new_songs[title] = {field: default(title) for field, default in REQUIRED_FIELDS.items()}
+        new_songs_added.append(title)
+        logging.info(f"Adding new song to metadata with default values: {title}")
             
     # Ensure all songs have required fields
-    for title in new_tags["songs"]:
-        song_data = new_tags["songs"][title]
+    for title, song_data in new_songs.items():
         # Add default values for any missing required fields
         missing_fields = []
-        if "actual_title" not in song_data:
-            song_data["actual_title"] = title
-            missing_fields.append("actual_title")
-        if "status" not in song_data:
-            song_data["status"] = "deferred"
-            missing_fields.append("status")
-        if "tags" not in song_data or song_data["tags"] is None:
-            song_data["tags"] = []
-            missing_fields.append("tags")
-        if "notes" not in song_data or song_data["notes"] is None:
-            song_data["notes"] = []
-            missing_fields.append("notes")
-        if "ai_generated" not in song_data:
-            song_data["ai_generated"] = False
-            missing_fields.append("ai_generated")
-            
+        for field, default in REQUIRED_FIELDS.items():
+            if song_data.get(field) is None:
+                song_data[field] = default(title)
+                missing_fields.append(field)
+        
         if missing_fields:
-            logging.debug(f"Added missing fields for {title}: {', '.join(missing_fields)}")
+            logging.debug("Added missing fields for %s: %s", title, ", ".join(missing_fields))
     
     # Write the tags
     if not dry_run:
-        # Create a backup of the current file if it exists
-        if os.path.exists(output_file):
-            backup_file = f"{output_file}.bak"
-            try:
-                shutil.copy2(output_file, backup_file)
-                logging.info(f"Created backup of existing metadata file: {backup_file}")
-            except Exception as e:
-                logging.error(f"Failed to create backup: {str(e)}")
-        
-        with open(output_file, "w") as f:
-            yaml.dump(new_tags, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-        logging.info(f"Updated metadata written to {output_file} with {len(new_tags.get('songs', {}))} songs")
+        if dump_tags(new_tags, output_file, backup_file=f"{output_file}.bak"):
+            logging.info(f"Updated metadata written to {output_file} with {len(new_tags.get('songs', {}))} songs")
         
         # Log a summary of changes
         if new_songs_added:
@@ -249,6 +357,81 @@ def generate_song_metadata(base_dir: str, output_file: str, dry_run: bool = Fals
     
     return new_tags
 
+def update_song_metadata(base_dir: str, output_file: str, verbose: bool = False,
+                         lyrics_files: Optional[List[str]] = None) -> None:
+    """Regenerate output_file from the lyrics under base_dir, writing only when something changed.
+
+    Pass lyrics_files to reuse a scan the caller already made.
+    """
+    # Load the metadata once; the same pre-update snapshot is used for the comparison below
+    existing_tags = load_existing_metadata(output_file)
+    
+    # Generate new metadata
+    new_tags = generate_song_metadata(
+        base_dir, 
+        output_file, 
+        verbose=verbose,
+        existing_tags=existing_tags,
+        lyrics_files=lyrics_files
+    )
+    if not new_tags or not new_tags.get("songs"):
+        logging.error("Failed to generate metadata - no songs found")
+        return
+    
+    logging.info(f"Generated metadata for {len(new_tags.get('songs', {}))} songs")
+    
+    # Check if file exists and compare with existing
+    if os.path.exists(output_file):
+        # Compare existing and new tags
+        existing_songs = existing_tags.get("songs", {})
+        new_songs = new_tags.get("songs", {})
+        
+        # Any kept song that was missing required fields means the file needs rewriting;
+        # generate_song_metadata has already filled them in new_songs, so stop at the first one
+        has_changes = any(not has_required_fields(existing_songs[title])
+                          for title in new_songs if title in existing_songs)
+        
+        # Check for new songs that weren't in the existing metadata
+        comparison_result = compare_tags(existing_tags, new_tags)
+        new_song_count = len(comparison_result["new_songs"])
+        restored_song_count = len(comparison_result["restored_songs"])
+        
+        if new_song_count > 0:
+            has_changes = True
+            logging.info(f"Found {new_song_count} new songs to add to metadata:")
+            for song in comparison_result["new_songs"]:
+                logging.info(f"  - {song}")
+        
+        if restored_song_count > 0:
+            has_changes = True
+            logging.info(f"Summary: Restored {restored_song_count} songs from backup metadata:")
+            for song in comparison_result["restored_songs"]:
+                logging.info(f"  - {song}")
+        
+        # Songs without a lyrics folder anymore are dropped from the metadata
+        removed = comparison_result["missing_songs"]
+        if removed:
+            has_changes = True
+            logging.info("Summary: Removed %d deleted songs from metadata: %s", len(removed), ", ".join(removed))
+            for old_title, new_title in comparison_result["possible_renames"]:
+                logging.warning("'%s' looks like a rename of '%s'; its metadata was not carried over", new_title, old_title)
+        
+        if not has_changes:
+            logging.info(f"Summary: No changes needed in {output_file}")
+            return
+        
+        # Write to main file
+        write_tags(new_tags, output_file)
+        
+        # Log a summary of changes
+        if new_song_count > 0:
+            logging.info(f"Summary: Added {new_song_count} new songs to {output_file}")
+        # Log the summary of what was done
+        logging.info(f"Summary: Updated metadata in {output_file} successfully")
+    
+    # Log success message outside of all try-except blocks
+    logging.info("=== Successfully completed song metadata generation ===")
+
 def main():
     """Main function to generate song metadata."""
     # Set up more verbose logging based on command line arguments
@@ -262,15 +445,8 @@ def main():
     
     log_level = logging.DEBUG if args.debug else (logging.INFO if args.verbose else logging.INFO)
     
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.FileHandler('generate_song_metadata.log'),
-            logging.StreamHandler()
-        ]
-    )
+    setup_queue_logging('generate_song_metadata.log', level=log_level,
+                        fmt='%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
     
     # Use parent directory for finding lyrics files
     base_dir = ".."
@@ -288,80 +464,7 @@ def main():
             logging.info(f"No backup metadata file found at: {os.path.abspath(backup_path)}")
     
     try:
-        # Generate new metadata
-        new_tags = generate_song_metadata(
-            base_dir, 
-            output_file, 
-            verbose=args.verbose or args.debug
-        )
-        if not new_tags or not new_tags.get("songs"):
-            logging.error("Failed to generate metadata - no songs found")
-            return
-        
-        logging.info(f"Generated metadata for {len(new_tags.get('songs', {}))} songs")
-        
-        # Check if file exists and compare with existing
-        if os.path.exists(output_file):
-            with open(output_file, "r") as f:
-                existing_tags = yaml.safe_load(f)
-                logging.info(f"Loaded existing metadata from {output_file} for comparison")
-            
-            # Compare existing and new tags
-            existing_songs = existing_tags.get("songs", {})
-            new_songs = new_tags.get("songs", {})
-            
-            # Check if any song is missing tags or notes
-            has_changes = False
-            for title in new_songs:
-                if title in existing_songs:
-                    existing_song = existing_songs[title]
-                    new_song = new_songs[title]
-                    
-                    # Check for missing tags
-                    if "tags" not in existing_song or existing_song["tags"] is None:
-                        has_changes = True
-                        logging.debug(f"Adding missing tags field to {title}")
-                        new_song["tags"] = []
-                    
-                    # Check for missing notes
-                    if "notes" not in existing_song or existing_song["notes"] is None:
-                        has_changes = True
-                        logging.debug(f"Adding missing notes field to {title}")
-                        new_song["notes"] = []
-            
-            # Check for new songs that weren't in the existing metadata
-            comparison_result = compare_tags(existing_tags, new_tags)
-            new_song_count = len(comparison_result["new_songs"])
-            restored_song_count = len(comparison_result["restored_songs"])
-            
-            if new_song_count > 0:
-                has_changes = True
-                logging.info(f"Found {new_song_count} new songs to add to metadata:")
-                for song in comparison_result["new_songs"]:
-                    logging.info(f"  - {song}")
-            
-            if restored_song_count > 0:
-                has_changes = True
-                logging.info(f"Summary: Restored {restored_song_count} songs from backup metadata:")
-                for song in comparison_result["restored_songs"]:
-                    logging.info(f"  - {song}")
-            
-            if not has_changes:
-                logging.info(f"Summary: No changes needed in {output_file}")
-                return
-            
-            # Write to main file
-            write_tags(new_tags, output_file)
-            
-            # Log a summary of changes
-            if new_song_count > 0:
-                logging.info(f"Summary: Added {new_song_count} new songs to {output_file}")
-            # Log the summary of what was done
-            logging.info(f"Summary: Updated metadata in {output_file} successfully")
-        
-        # Log success message outside of all try-except blocks
-        logging.info("=== Successfully completed song metadata generation ===")
-        
+        update_song_metadata(base_dir, output_file, verbose=args.verbose or args.debug)
     except Exception as e:
         logging.error(f"Error in main execution: {str(e)}")
         sys.exit(1)
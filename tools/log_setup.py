@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""Logging setup shared by the song tools' command-line entry points."""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+def setup_queue_logging(log_file: str, level: int = logging.INFO, fmt: str = '%(message)s',
+                        datefmt: str = None) -> QueueListener:
+    """Log to log_file and the console through a queue, so file/console writes happen on a background thread.
+
+    The listener is stopped (and the queue drained) at interpreter exit.
+    """
+    log_queue = queue.SimpleQueue()
+    formatter = logging.Formatter(fmt, datefmt=datefmt)
+    log_handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in log_handlers:
+        handler.setFormatter(formatter)
+    listener = QueueListener(log_queue, *log_handlers)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logging.basicConfig(
+        level=level,
+        format='%(message)s',
+        handlers=[QueueHandler(log_queue)]
+    )
+    return listener
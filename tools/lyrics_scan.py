@@ -0,0 +1,76 @@
+"""Directory scan shared by consolidate_songs.py and generate_song_metadata.py."""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Directories never searched for lyrics (hidden directories are skipped too)
+SKIP_DIRS = frozenset({"tools", "node_modules", "venv", "__pycache__"})
+
+# Lowercase filename suffix of lyrics files, and the generated file that shares it
+LYRICS_SUFFIX = "_lyrics.txt"
+LYRICS_SUFFIX_LEN = len(LYRICS_SUFFIX)
+CONSOLIDATED_LYRICS_NAME = "consolidated_songs_lyrics.txt"
+
+# Directory listings kept in flight at once; scandir calls block on I/O, not the GIL
+SCAN_WORKERS = 16
+
+def _is_searched_dir(name):
+    """Skip the tools directory and VCS/environment directories."""
+    return name not in SKIP_DIRS and not name.startswith('.')
+
+def _list_dir(path):
+    """Return (name, path, is_dir) for the regular files and directories in path, skipping symlinks."""
+    try:
+        with os.scandir(path) as it:
+            return [(entry.name, entry.path, entry.is_dir()) for entry in it
+                    if not entry.is_symlink() and (entry.is_dir() or entry.is_file())]
+    except OSError as e:
+        # Unreadable, or removed/renamed since its parent was listed (as os.walk does, skip it)
+        logging.debug(f"Could not list directory, skipping: {path} ({e})")
+        return []
+
+def _list_tree(base_dir):
+    """List base_dir and all searched subdirectories concurrently, keyed by directory path."""
+    listings = {}
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        pending = {executor.submit(_list_dir, base_dir): base_dir}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                entries = listings[pending.pop(future)] = future.result()
+                for name, child, is_dir in entries:
+                    if is_dir and _is_searched_dir(name):
+                        pending[executor.submit(_list_dir, child)] = child
+    return listings
+
+def _walk_listings(listings, path, potential_lyrics_files):
+    """Yield lyrics files from the prefetched listings in the same depth-first order as a sequential scan."""
+    for name, child, is_dir in listings[path]:
+        if is_dir:
+            if _is_searched_dir(name):
+                yield from _walk_listings(listings, child, potential_lyrics_files)
+        # Fully case-insensitive matching for _lyrics.txt, lowercasing only the tail
+        elif name[-LYRICS_SUFFIX_LEN:].lower() == LYRICS_SUFFIX:
+            # Skip the consolidated_songs_lyrics.txt file
+            if len(name) == len(CONSOLIDATED_LYRICS_NAME) and name.lower() == CONSOLIDATED_LYRICS_NAME:
+                continue
+            yield child
+        # Log potential lyrics files for debugging (only collected at DEBUG level)
+        elif potential_lyrics_files is not None:
+            name = name.lower()
+            if "lyric" in name or "song" in name or "text" in name:
+                potential_lyrics_files.append(child)
+
+def scan_lyrics_files(path, potential_lyrics_files=None):
+    """Yield lyrics file paths under path.
+
+    Directory listings are fetched on a thread pool so slow storage sees many
+    scandir calls in flight; paths are then yielded in the same order a
+    sequential depth-first scan would produce, which duplicate-title
+    resolution in consolidate_songs relies on.
+
+    When potential_lyrics_files is a list, near-miss filenames (containing
+    "lyric", "song" or "text") are appended to it for debugging.
+    """
+    yield from _walk_listings(_list_tree(path), path, potential_lyrics_files)
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 import os
 import yaml
-from typing import Dict, List, Optional
-import logging
+try:
+    # Prefer the libyaml-backed C implementation when PyYAML was built with it
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+from typing import Dict, List, Sequence
 import sys
 import signal
 import readline
+import bisect
 from normalize_new_song import normalize_title
 
 def signal_handler(signum, frame):
@@ -17,16 +22,31 @@ def signal_handler(signum, frame):
 signal.signal(signal.SIGINT, signal_handler)  # Handle Ctrl+C
 signal.signal(signal.SIGTERM, signal_handler) # Handle termination signal
 
+# Statuses offered when adding or updating a song
+VALID_STATUSES = ("released", "deferred", "in_progress", "draft")
+
 class SimpleCompleter:
     """Simple autocomplete for song titles."""
     def __init__(self, songs: List[str]):
         self.songs = songs
+        # Case-insensitive prefix index: casefolded titles in sorted order, originals alongside
+        index = sorted((s.casefold(), s) for s in songs)
+        self.keys = [key for key, _ in index]
+        self.sorted_songs = [song for _, song in index]
+        self.text = None
+        self.matches = []
         
     def complete(self, text, state):
         """Return the next possible completion for text."""
-        if state == 0:
+        # Only recompute when the prefix changed since the last Tab
+        if state == 0 and text != self.text:
+            self.text = text
             if text:
-                self.matches = [s for s in self.songs if s.startswith(text)]
+                prefix = text.casefold()
+                start = end = bisect.bisect_left(self.keys, prefix)
+                while end < len(self.keys) and self.keys[end].startswith(prefix):
+                    end += 1
+                self.matches = self.sorted_songs[start:end]
             else:
                 self.matches = self.songs[:]
 
@@ -40,24 +60,38 @@ class SongMetadataManager:
         """Initialize the song metadata manager."""
         self.base_dir = base_dir
         self.tags_file = os.path.join(base_dir, "song_metadata.yml")
-        self.tags = self._load_tags()
+        # Parsed on first access, so showing the menu never waits on the YAML
+        self._tags = None
+        # Tab completion; matches are case-insensitive, so let readline merge them that way too
+        readline.parse_and_bind('tab: complete')
+        readline.parse_and_bind('set completion-ignore-case on')
+        
+    @property
+    def tags(self) -> Dict:
+        """Song metadata, loaded from tags_file the first time it is needed."""
+        if self._tags is None:
+            self._tags = self._load_tags()
+        return self._tags
         
     def _load_tags(self) -> Dict:
         """Load song metadata from file."""
         try:
-            with open(self.tags_file, "r") as f:
-                return yaml.safe_load(f)
+            with open(self.tags_file, "r", encoding="utf-8") as f:
+                return yaml.load(f, Loader=SafeLoader)
         except FileNotFoundError:
             return {"songs": {}}
             
     def _save_tags(self) -> None:
         """Save song metadata to file."""
-        with open(self.tags_file, "w") as f:
-            yaml.dump(self.tags, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        # Write a temp file and swap it in so readers never see a half-written file
+        tmp_file = f"{self.tags_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            yaml.dump(self.tags, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        os.replace(tmp_file, self.tags_file)
             
     def _get_song_list(self) -> List[str]:
         """Get a list of all songs."""
-        return list(self.tags["songs"].keys())
+        return list(self.tags["songs"])
         
     def _get_song_data(self, song_key: str) -> Dict:
         """Get data for a specific song."""
@@ -77,38 +111,40 @@ class SongMetadataManager:
         print("5. Rename song")
         print("6. Exit")
         
-    def _get_choice(self, prompt: str, choices: List[str]) -> str:
+    def _get_choice(self, prompt: str, choices: Sequence[str]) -> str:
         """Get user choice from a list of options with autocomplete."""
-        while True:
-            print(f"\n{prompt}")
-            print("Type to autocomplete or enter a number:")
-            for i, choice in enumerate(choices, 1):
-                print(f"{i}. {choice}")
-            
-            try:
-                # Set up readline completer
-                completer = SimpleCompleter(choices)
-                readline.set_completer(completer.complete)
-                readline.parse_and_bind('tab: complete')
-                
-                # Get input
-                choice = input("Enter choice (number or type to autocomplete): ").strip()
-                
-                # Try to convert to number first
+        # Set up readline completer once for this prompt; key bindings are set in __init__
+        completer = SimpleCompleter(choices)
+        readline.set_completer(completer.complete)
+        # The numbered list is shown once; retries only repeat the input prompt
+        print(f"\n{prompt}")
+        print("Type to autocomplete or enter a number:")
+        for i, choice in enumerate(choices, 1):
+            print(f"{i}. {choice}")
+        try:
+            while True:
                 try:
-                    choice_num = int(choice)
-                    if 1 <= choice_num <= len(choices):
-                        return choices[choice_num - 1]
-                except ValueError:
-                    # If not a number, check if it's a complete song title
-                    if choice in choices:
-                        return choice
+                    # Get input
+                    choice = input("Enter choice (number or type to autocomplete): ").strip()
                     
-                    # If not found, show error
-                    print("Invalid choice. Please try again.")
-            except EOFError:
-                print("\nExiting...")
-                sys.exit(0)
+                    # Try to convert to number first
+                    try:
+                        choice_num = int(choice)
+                        if 1 <= choice_num <= len(choices):
+                            return choices[choice_num - 1]
+                        print(f"Invalid choice. Enter a number from 1 to {len(choices)}.")
+                    except ValueError:
+                        # If not a number, check if it's a complete song title
+                        if choice in choices:
+                            return choice
+                        
+                        # If not found, show error
+                        print("Invalid choice. Please try again.")
+                except EOFError:
+                    print("\nExiting...")
+                    sys.exit(0)
+        finally:
+            readline.set_completer(None)
                 
     def _get_song_key(self, prompt: str) -> str:
         """Get a normalized song key from user input."""
@@ -157,13 +193,12 @@ class SongMetadataManager:
             add_tag = input("Add another tag? (y/n): ").lower()
             
         # Get status
-        valid_statuses = ["released", "deferred", "in_progress", "draft"]
         if "status" in existing_data:
             default_status = existing_data["status"]
         else:
             default_status = "deferred"
             
-        status = self._get_choice("\nSelect status", valid_statuses)
+        status = self._get_choice("\nSelect status", VALID_STATUSES)
         metadata["status"] = status
         
         # Get notes
@@ -184,14 +219,15 @@ class SongMetadataManager:
         
     def list_songs(self) -> None:
         """List all songs with their metadata."""
-        print("\nAll Songs:")
-        for song_key in self._get_song_list():
-            data = self._get_song_data(song_key)
-            print(f"\n{song_key}")
-            print(f"Actual Title: {data.get('actual_title', 'N/A')}")
-            print(f"Status: {data.get('status', 'N/A')}")
-            print(f"Tags: {', '.join(data.get('tags', []))}")
-            print(f"Notes: {', '.join(data.get('notes', []))}")
+        lines = ["\nAll Songs:"]
+        for song_key, data in self.tags["songs"].items():
+            lines.append(f"\n{song_key}\n"
+                         f"Actual Title: {data.get('actual_title', 'N/A')}\n"
+                         f"Status: {data.get('status', 'N/A')}\n"
+                         f"Tags: {', '.join(data.get('tags', []))}\n"
+                         f"Notes: {', '.join(data.get('notes', []))}")
+        # Write the whole report at once instead of five print calls per song
+        sys.stdout.write("\n".join(lines) + "\n")
             
     def add_song(self) -> None:
         """Add a new song."""
@@ -213,7 +249,8 @@ class SongMetadataManager:
             return
             
         # Check if song already exists
-        if normalized in self.tags["songs"]:
+        songs = self.tags["songs"]
+        if normalized in songs:
             print(f"\nError: Song '{normalized}' already exists.")
             return
             
@@ -228,7 +265,7 @@ class SongMetadataManager:
         
         # Create lyrics file
         lyrics_file = os.path.join(folder_path, f"{normalized}_lyrics.txt")
-        with open(lyrics_file, "w") as f:
+        with open(lyrics_file, "w", encoding="utf-8", newline="\n") as f:
             f.write(f"{title}\n\n")  # Write the original title as the first line
         print(f"Created lyrics file: {lyrics_file}")
         
@@ -244,18 +281,17 @@ class SongMetadataManager:
         # Get additional metadata (tags, status, notes)
         metadata.update(self._get_metadata(metadata))
         
-        self.tags["songs"][normalized] = metadata
+        songs[normalized] = metadata
         self._save_tags()
         print(f"\nSuccessfully added song: {normalized}")
         
     def update_song(self) -> None:
         """Update an existing song's metadata."""
-        songs = self._get_song_list()
-        if not songs:
+        if not self.tags["songs"]:
             print("\nNo songs found!")
             return
             
-        song_key = self._get_choice("\nSelect song to update", songs)
+        song_key = self._get_choice("\nSelect song to update", self._get_song_list())
         existing_data = self._get_song_data(song_key)
         
         # Get folder path
@@ -284,13 +320,13 @@ class SongMetadataManager:
             update_lyrics = input("\nUpdate lyrics file? (y/n): ").lower()
             if update_lyrics == 'y':
                 try:
-                    with open(lyrics_file, "r") as f:
+                    with open(lyrics_file, "r", encoding="utf-8") as f:
                         lyrics = f.read()
                     print(f"\nCurrent lyrics:\n{lyrics}")
                     
                     new_lyrics = input("\nEnter new lyrics (press Enter to keep current): ").strip()
                     if new_lyrics:
-                        with open(lyrics_file, "w") as f:
+                        with open(lyrics_file, "w", encoding="utf-8", newline="\n") as f:
                             f.write(new_lyrics)
                         print(f"\nUpdated lyrics file: {os.path.basename(lyrics_file)}")
                 except Exception as e:
@@ -300,12 +336,11 @@ class SongMetadataManager:
         
     def delete_song(self) -> None:
         """Delete an existing song."""
-        songs = self._get_song_list()
-        if not songs:
+        if not self.tags["songs"]:
             print("\nNo songs found!")
             return
             
-        song_key = self._get_choice("\nSelect song to delete", songs)
+        song_key = self._get_choice("\nSelect song to delete", self._get_song_list())
         
         # Get folder path
         folder_path = os.path.join(self.base_dir, song_key)
@@ -327,15 +362,15 @@ class SongMetadataManager:
         
     def rename_song(self) -> None:
         """Rename an existing song."""
-        songs = self._get_song_list()
+        songs = self.tags["songs"]
         if not songs:
             print("\nNo songs found!")
             return
             
-        old_key = self._get_choice("\nSelect song to rename", songs)
+        old_key = self._get_choice("\nSelect song to rename", list(songs))
         new_key = self._get_song_key("Enter new song title")
         
-        if new_key in self.tags["songs"]:
+        if new_key in songs:
             print(f"\nError: Song '{new_key}' already exists.")
             return
             
@@ -355,12 +390,13 @@ class SongMetadataManager:
                     print(f"\nError: Folder '{new_folder}' already exists.")
                     return
                 
-                # Move folder contents
+                # Move folder contents; shutil.move is a single os.rename on the same
+                # filesystem and only copies across devices
                 shutil.move(old_folder, new_folder)
                 print(f"\nRenamed folder: {old_folder} -> {new_folder}")
                 
                 # Get the original lyrics file name from metadata
-                old_data = self.tags["songs"][old_key]
+                old_data = songs[old_key]
                 old_lyrics_name = old_data.get("original_lyrics_name", f"{old_key}_lyrics.txt")
                 
                 # Construct old and new lyrics file paths
@@ -373,15 +409,14 @@ class SongMetadataManager:
                         os.rename(old_lyrics, new_lyrics)
                         print(f"Renamed lyrics file: {os.path.basename(old_lyrics)} -> {os.path.basename(new_lyrics)}")
                         # Update the metadata with the new lyrics name
-                        self.tags["songs"][new_key]["original_lyrics_name"] = os.path.basename(new_lyrics)
+                        old_data["original_lyrics_name"] = os.path.basename(new_lyrics)
                     except Exception as e:
                         print(f"Warning: Could not rename lyrics file {os.path.basename(old_lyrics)}: {str(e)}")
                 else:
                     print(f"Warning: Could not find lyrics file '{old_lyrics_name}' in {new_folder}")
             
             # Update metadata
-            self.tags["songs"][new_key] = self.tags["songs"][old_key]
-            del self.tags["songs"][old_key]
+            songs[new_key] = songs.pop(old_key)
             self._save_tags()
             print(f"\nSuccessfully renamed song: {old_key} -> {new_key}")
             
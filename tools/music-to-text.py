@@ -1,52 +1,55 @@
 import os
 import subprocess
 import sys
-import wave
 
 # Function to install a package using pip
 def install(package):
     subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
-# Function to install a package using apt-get
-def install_apt(package):
-    subprocess.check_call(["apt-get", "install", "-y", package])
-
-# Install necessary libraries
-try:
-    import mutagen
-except ImportError:
-    install("mutagen")
-
-try:
-    import vosk
-except ImportError:
-    install("vosk")
+# Install necessary libraries only when asked; a normal run just imports them
+if "--bootstrap" in sys.argv:
+    try:
+        import mutagen
+    except ImportError:
+        install("mutagen")
 
-try:
-    import pydub
-except ImportError:
-    install("pydub")
+    try:
+        import vosk
+    except ImportError:
+        install("vosk")
 
-try:
-    subprocess.check_call(["ffmpeg", "-version"])
-except subprocess.CalledProcessError:
-    install_apt("ffmpeg")
+    try:
+        import av
+    except ImportError:
+        install("av")
 
 import json
+import multiprocessing
+import av
 from mutagen.id3 import ID3, USLT, ID3NoHeaderError
 from vosk import Model, KaldiRecognizer
 
-def convert_mp3_to_wav(mp3_path, wav_path):
-    # Ensure temp.wav is deleted if it exists
-    if os.path.exists(wav_path):
-        os.remove(wav_path)
-    # Convert to WAV with mono PCM format and 16kHz sample rate
-    result = subprocess.run(['ffmpeg', '-y', '-i', mp3_path, '-ac', '1', '-ar', '16000', wav_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if result.returncode != 0:
-        print(f"Error converting {mp3_path} to {wav_path}")
-        print(result.stderr.decode('utf-8'))
-    else:
-        print(f"Successfully converted {mp3_path} to {wav_path}")
+# Vosk expects mono 16-bit PCM; feed it 32000 frames (2 s of audio) per call
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 32000
+CHUNK_BYTES = CHUNK_FRAMES * 2
+
+def decode_mp3_pcm(mp3_path):
+    """Decode an MP3 in-process with libav, yielding mono 16kHz s16 PCM chunks."""
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=SAMPLE_RATE)
+    buffer = bytearray()
+    with av.open(mp3_path) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                buffer += resampled.to_ndarray().tobytes()
+                while len(buffer) >= CHUNK_BYTES:
+                    yield bytes(buffer[:CHUNK_BYTES])
+                    del buffer[:CHUNK_BYTES]
+        # Flush samples still held by the resampler
+        for resampled in resampler.resample(None):
+            buffer += resampled.to_ndarray().tobytes()
+    if buffer:
+        yield bytes(buffer)
 
 def extract_lyrics_metadata(mp3_path):
     try:
@@ -57,28 +60,25 @@ def extract_lyrics_metadata(mp3_path):
     except ID3NoHeaderError:
         return None
 
-def recognize_speech_from_wav(wav_path, model_path):
-    wf = wave.open(wav_path, "rb")
-    print(f"Channels: {wf.getnchannels()}, Sample Width: {wf.getsampwidth()}, Frame Rate: {wf.getframerate()}")
-    if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != 16000:
-        raise ValueError("Audio file must be WAV format mono PCM with 16kHz sample rate.")
-    
+def load_model(model_path):
     if not os.path.isdir(model_path):
         raise Exception(f"Model path {model_path} does not exist or is not a directory")
     
     try:
-        model = Model(model_path)
+        return Model(model_path)
     except Exception as e:
         raise Exception(f"Failed to create a model: {str(e)}")
-    
-    rec = KaldiRecognizer(model, wf.getframerate())
+
+def create_recognizer(model):
+    rec = KaldiRecognizer(model, SAMPLE_RATE)
     rec.SetWords(True)
-    
+    return rec
+
+def recognize_speech_from_mp3(mp3_path, rec):
+    # The recognizer is shared across files; start each one from a clean state
+    rec.Reset()
     results = []
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
+    for data in decode_mp3_pcm(mp3_path):
         if rec.AcceptWaveform(data):
             results.append(json.loads(rec.Result()))
     
@@ -90,52 +90,76 @@ def recognize_speech_from_wav(wav_path, model_path):
 def format_lyrics(text):
     # Split text into lines based on punctuation and add new lines at regular intervals
     lines = []
-    sentence = ""
-    word_count = 0
+    words = []
     max_words_per_line = 10  # Adjust this value as needed
 
     for word in text.split():
-        sentence += word + " "
-        word_count += 1
-        if word.endswith((".", "!", "?")) or word_count >= max_words_per_line:
-            lines.append(sentence.strip())
-            sentence = ""
-            word_count = 0
+        words.append(word)
+        if word.endswith((".", "!", "?")) or len(words) >= max_words_per_line:
+            lines.append(" ".join(words))
+            words.clear()
 
-    if sentence:
-        lines.append(sentence.strip())
+    if words:
+        lines.append(" ".join(words))
 
     return "\n".join(lines)
 
-def process_directory(mp3_directory, model_path):
-    for filename in os.listdir(mp3_directory):
-        if filename.endswith(".mp3"):
-            mp3_file_path = os.path.join(mp3_directory, filename)
-            wav_file_path = "temp.wav"
-            txt_file_path = os.path.splitext(mp3_file_path)[0] + ".txt"
-
-            lyrics = extract_lyrics_metadata(mp3_file_path)
-            if not lyrics:
-                convert_mp3_to_wav(mp3_file_path, wav_file_path)
-                # Check the converted file format
-                wf = wave.open(wav_file_path, "rb")
-                print(f"Converted - Channels: {wf.getnchannels()}, Sample Width: {wf.getsampwidth()}, Frame Rate: {wf.getframerate()}")
-                lyrics = recognize_speech_from_wav(wav_file_path, model_path)
-            
-            formatted_lyrics = format_lyrics(lyrics)
-            
-            with open(txt_file_path, "w") as txt_file:
-                txt_file.write(formatted_lyrics)
-            print(f"Extracted lyrics for {filename} and saved to {txt_file_path}")
-
-# Directory containing MP3 files
-mp3_directory = "/content"  # Update this path if necessary
-# Path to Vosk model
-model_path = "/content/vosk-model-small-en-us-0.15"  # Update this path if necessary
-
-# Ensure the model is correctly downloaded and unzipped
-if not os.path.isdir(model_path):
-    raise Exception(f"Model path {model_path} does not exist. Please download and unzip the model correctly.")
-
-# Process the directory
-process_directory(mp3_directory, model_path)
+# Per-process recognizer state for the worker pool
+_model = None
+_rec = None
+
+def _init_worker(model_path):
+    global _model, _rec
+    # Forked workers inherit the model loaded by the parent; spawned ones load their own
+    if _model is None:
+        _model = load_model(model_path)
+    _rec = create_recognizer(_model)
+
+def process_file(mp3_file_path):
+    txt_file_path = os.path.splitext(mp3_file_path)[0] + ".txt"
+
+    lyrics = extract_lyrics_metadata(mp3_file_path)
+    if not lyrics:
+        # Decode straight into the recognizer; no ffmpeg process or temp WAV file
+        lyrics = recognize_speech_from_mp3(mp3_file_path, _rec)
+    
+    formatted_lyrics = format_lyrics(lyrics)
+    
+    with open(txt_file_path, "w") as txt_file:
+        txt_file.write(formatted_lyrics)
+    return f"Extracted lyrics for {os.path.basename(mp3_file_path)} and saved to {txt_file_path}"
+
+def process_directory(mp3_directory, model_path, workers=None):
+    global _model
+    mp3_files = [os.path.join(mp3_directory, filename)
+                 for filename in os.listdir(mp3_directory) if filename.endswith(".mp3")]
+    if not mp3_files:
+        return
+    
+    # Files are independent, so transcribe them on all cores
+    workers = min(workers or os.cpu_count() or 1, len(mp3_files))
+    if sys.platform.startswith("linux"):
+        # Load the model once in the parent so forked workers share its pages copy-on-write
+        context = multiprocessing.get_context("fork")
+        _model = load_model(model_path)
+    else:
+        # Forking after native libraries are loaded is unsafe on macOS (hence its spawn
+        # default); each worker loads its own model in the initializer
+        context = multiprocessing.get_context()
+    
+    with context.Pool(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        for message in pool.imap_unordered(process_file, mp3_files):
+            print(message)
+
+if __name__ == "__main__":
+    # Directory containing MP3 files
+    mp3_directory = "/content"  # Update this path if necessary
+    # Path to Vosk model
+    model_path = "/content/vosk-model-small-en-us-0.15"  # Update this path if necessary
+    
+    # Ensure the model is correctly downloaded and unzipped
+    if not os.path.isdir(model_path):
+        raise Exception(f"Model path {model_path} does not exist. Please download and unzip the model correctly.")
+    
+    # Process the directory
+    process_directory(mp3_directory, model_path)
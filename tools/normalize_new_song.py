@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 from typing import Dict
 import logging
+import re
+import unicodedata
+from functools import lru_cache
 import sys
 
+# Anything that is not alphanumeric, a space or a hyphen (\w is alphanumerics plus "_")
+_SPECIAL_CHARS_RE = re.compile(r'[^\w -]|_')
+_HYPHEN_RUN_RE = re.compile(r'-{2,}')
+
+# Entries kept by every normalize_title cache (song_manager.py keeps its own copy of the function)
+NORMALIZE_TITLE_CACHE_SIZE = 8192
+
+@lru_cache(maxsize=NORMALIZE_TITLE_CACHE_SIZE)
 def normalize_title(title: str) -> str:
     """
     Normalize a song title to a consistent format:
@@ -14,24 +29,17 @@ def normalize_title(title: str) -> str:
     - Remove leading/trailing hyphens
     - Handle Unicode characters properly
     """
-    import unicodedata
-    
     # Normalize Unicode characters (NFKD form)
     normalized = unicodedata.normalize('NFKD', title)
-    # Remove combining characters (accents, etc.)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    # Remove special characters except hyphens
-    normalized = ''.join(c if c.isalnum() or c == '-' or c == ' ' else '' for c in normalized)
-    # Convert to lowercase
-    normalized = normalized.lower()
-    # Replace spaces with hyphens
-    normalized = normalized.replace(' ', '-')
-    # Remove multiple consecutive hyphens
-    while '--' in normalized:
-        normalized = normalized.replace('--', '-')
-    # Remove leading/trailing hyphens
-    normalized = normalized.strip('-')
-    return normalized
+    # Remove combining characters (accents, etc.); plain ASCII has none to remove
+    if not normalized.isascii():
+        normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    # Remove special characters except hyphens and spaces, in one C-level pass
+    normalized = _SPECIAL_CHARS_RE.sub('', normalized)
+    # Convert to lowercase and replace spaces with hyphens
+    normalized = normalized.lower().replace(' ', '-')
+    # Collapse runs of hyphens and remove leading/trailing ones
+    return _HYPHEN_RUN_RE.sub('-', normalized).strip('-')
 
 def normalize_new_song(base_dir: str, song_dir: str) -> None:
     """
@@ -70,17 +78,14 @@ def normalize_new_song(base_dir: str, song_dir: str) -> None:
         os.rename(full_path, new_path)
         logging.info(f"Renamed {full_path} to {new_path}")
         
-        # Update song_tags.yml
-        with open("song_tags.yml", "r") as f:
-            tags = yaml.safe_load(f)
-            
         lyrics_file = os.path.join(new_path, f"{os.path.basename(new_path)}_lyrics.txt")
         if os.path.exists(lyrics_file):
-            with open(lyrics_file, "r") as f:
+            with open(lyrics_file, "r", encoding="utf-8") as f:
                 actual_title = f.readline().strip()  # Assume first line is the title
             
-            with open("song_metadata.yml", "r") as f:
-                tags = yaml.safe_load(f)
+            metadata_file = "song_metadata.yml"
+            with open(metadata_file, "r", encoding="utf-8") as f:
+                tags = yaml.load(f, Loader=SafeLoader)
             
             if "songs" not in tags:
                 tags["songs"] = {}
@@ -92,9 +97,12 @@ def normalize_new_song(base_dir: str, song_dir: str) -> None:
                 "notes": []
             }
             
-            with open("song_metadata.yml", "w") as f:
-                yaml.dump(tags, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-                
+            # Write a temp file and swap it in so readers never see a half-written file
+            tmp_file = f"{metadata_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                yaml.dump(tags, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            os.replace(tmp_file, metadata_file)
+            
             logging.info(f"Updated song_metadata.yml: {song_dir} -> {normalized}")
         
     except Exception as e:
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 import os
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 from typing import Dict
 import logging
 import sys
@@ -22,13 +26,11 @@ def normalize_song_metadata(base_dir: str) -> None:
     try:
         # Load existing song metadata
         with open("song_metadata.yml", "r") as f:
-            tags = yaml.safe_load(f)
-            
-        # Create a mapping of old to new keys
-        updates = []
-        for old_key in list(tags["songs"]):  # Use list to avoid modifying while iterating
-            data = tags["songs"][old_key]
+            tags = yaml.load(f, Loader=SafeLoader)
             
+        # Map each old key to its normalized key
+        rename_map = {}
+        for old_key, data in tags["songs"].items():
             # Get the normalized key
             if "actual_title" in data:
                 # Use actual_title if available
@@ -41,19 +43,16 @@ def normalize_song_metadata(base_dir: str) -> None:
             if old_key.lower() == normalized_key:
                 continue
             
-            # Add to updates
-            updates.append((old_key, normalized_key))
+            rename_map[old_key] = normalized_key
+            logging.info(f"Updated song_metadata.yml: {old_key} -> {normalized_key}")
         
-        # Apply the updates
-        for old_key, new_key in updates:
-            data = tags["songs"][old_key]
-            tags["songs"][new_key] = data
-            del tags["songs"][old_key]
-            logging.info(f"Updated song_metadata.yml: {old_key} -> {new_key}")
+        # Apply the renames in one rebuild, keeping each song in place
+        if rename_map:
+            tags["songs"] = {rename_map.get(key, key): data for key, data in tags["songs"].items()}
         
         # Write updated metadata
         with open("song_metadata.yml", "w") as f:
-            yaml.dump(tags, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+            yaml.dump(tags, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
             
         logging.info("Successfully normalized all song keys in song_metadata.yml")
         
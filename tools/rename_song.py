@@ -2,7 +2,13 @@
 
 import os
 import yaml
+try:
+    # Prefer the libyaml-backed C implementation when PyYAML was built with it
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 import logging
+import re
 import sys
 from pathlib import Path
 
@@ -22,7 +28,7 @@ def load_yaml_file(file_path: str) -> dict:
     """Load a YAML file and return its contents."""
     try:
         with open(file_path, 'r') as f:
-            return yaml.safe_load(f)
+            return yaml.load(f, Loader=SafeLoader)
     except Exception as e:
         logging.error(f"Error loading {file_path}: {str(e)}")
         sys.exit(1)
@@ -31,11 +37,46 @@ def save_yaml_file(data: dict, file_path: str):
     """Save data to a YAML file."""
     try:
         with open(file_path, 'w') as f:
-            yaml.dump(data, f, default_flow_style=False)
+            yaml.dump(data, f, Dumper=SafeDumper, default_flow_style=False)
     except Exception as e:
         logging.error(f"Error saving {file_path}: {str(e)}")
         sys.exit(1)
 
+def _is_plain_key(key: str) -> bool:
+    """Check whether key is emitted as a bare (unquoted) YAML scalar."""
+    return yaml.dump(key, Dumper=SafeDumper).split("\n", 1)[0] == key
+
+def rename_yaml_key(file_path: str, old_title: str, new_title: str) -> bool:
+    """Rename a song key in place by patching the file text.
+
+    Only handles the common case of plain keys written directly under
+    'songs:'; returns False (leaving the file untouched) whenever the YAML
+    needs to be fully loaded and rewritten instead.
+    """
+    if not (_is_plain_key(old_title) and _is_plain_key(new_title)):
+        return False
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except Exception as e:
+        logging.error(f"Error loading {file_path}: {str(e)}")
+        sys.exit(1)
+    if not text.startswith("songs:\n"):
+        return False
+    # Refuse to create a duplicate key; the full rewrite handles overwrites
+    if re.search(rf"^  {re.escape(new_title)}:", text, flags=re.M):
+        return False
+    text, count = re.subn(rf"^  {re.escape(old_title)}:", lambda m: f"  {new_title}:", text, count=1, flags=re.M)
+    if not count:
+        return False
+    try:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    except Exception as e:
+        logging.error(f"Error saving {file_path}: {str(e)}")
+        sys.exit(1)
+    return True
+
 def update_song_title(file_path: str, old_title: str, new_title: str):
     """Update a song title in a YAML file."""
     if file_path == "consolidated_songs.yml":
@@ -47,7 +88,12 @@ def update_song_title(file_path: str, old_title: str, new_title: str):
         except subprocess.CalledProcessError as e:
             logging.error(f"Error running consolidate_songs.py: {str(e)}")
     else:
-        # For song_tags.yml, we can update it directly
+        # For song_tags.yml, patch the key in place when possible
+        if rename_yaml_key(file_path, old_title, new_title):
+            logging.info(f"Updated title in {file_path}: {old_title} -> {new_title}")
+            return
+        
+        # Otherwise load, update and save the whole file
         data = load_yaml_file(file_path)
         
         if "songs" in data:
@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 import os
 import yaml
-from typing import Dict, List, Optional
+try:
+    # Prefer the libyaml-backed C implementation when PyYAML was built with it
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+from typing import Dict, List, Sequence
 import logging
+import re
+import unicodedata
+from functools import lru_cache
 import sys
 import signal
 import readline
+import bisect
+from normalize_new_song import NORMALIZE_TITLE_CACHE_SIZE
 
 # Set up logging
 logging.basicConfig(
@@ -17,6 +27,11 @@ logging.basicConfig(
     ]
 )
 
+# Anything that is not alphanumeric, a space or a hyphen (\w is alphanumerics plus "_")
+_SPECIAL_CHARS_RE = re.compile(r'[^\w -]|_')
+_HYPHEN_RUN_RE = re.compile(r'-{2,}')
+
+@lru_cache(maxsize=NORMALIZE_TITLE_CACHE_SIZE)
 def normalize_title(title: str) -> str:
     """
     Normalize a song title to a consistent format:
@@ -26,24 +41,17 @@ def normalize_title(title: str) -> str:
     - Remove leading/trailing hyphens
     - Handle Unicode characters properly
     """
-    import unicodedata
-    
     # Normalize Unicode characters (NFKD form)
     normalized = unicodedata.normalize('NFKD', title)
-    # Remove combining characters (accents, etc.)
-    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-    # Remove special characters except hyphens
-    normalized = ''.join(c if c.isalnum() or c == '-' or c == ' ' else '' for c in normalized)
-    # Convert to lowercase
-    normalized = normalized.lower()
-    # Replace spaces with hyphens
-    normalized = normalized.replace(' ', '-')
-    # Remove multiple consecutive hyphens
-    while '--' in normalized:
-        normalized = normalized.replace('--', '-')
-    # Remove leading/trailing hyphens
-    normalized = normalized.strip('-')
-    return normalized
+    # Remove combining characters (accents, etc.); plain ASCII has none to remove
+    if not normalized.isascii():
+        normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    # Remove special characters except hyphens and spaces, in one C-level pass
+    normalized = _SPECIAL_CHARS_RE.sub('', normalized)
+    # Convert to lowercase and replace spaces with hyphens
+    normalized = normalized.lower().replace(' ', '-')
+    # Collapse runs of hyphens and remove leading/trailing ones
+    return _HYPHEN_RUN_RE.sub('-', normalized).strip('-')
 
 def signal_handler(signum, frame):
     """Handle interrupt signals gracefully."""
@@ -54,16 +62,31 @@ def signal_handler(signum, frame):
 signal.signal(signal.SIGINT, signal_handler)  # Handle Ctrl+C
 signal.signal(signal.SIGTERM, signal_handler) # Handle termination signal
 
+# Statuses offered when adding or updating a song
+VALID_STATUSES = ("released", "deferred", "in_progress", "draft")
+
 class SimpleCompleter:
     """Simple autocomplete for song titles."""
     def __init__(self, songs: List[str]):
         self.songs = songs
+        # Case-insensitive prefix index: casefolded titles in sorted order, originals alongside
+        index = sorted((s.casefold(), s) for s in songs)
+        self.keys = [key for key, _ in index]
+        self.sorted_songs = [song for _, song in index]
+        self.text = None
+        self.matches = []
         
     def complete(self, text, state):
         """Return the next possible completion for text."""
-        if state == 0:
+        # Only recompute when the prefix changed since the last Tab
+        if state == 0 and text != self.text:
+            self.text = text
             if text:
-                self.matches = [s for s in self.songs if s.startswith(text)]
+                prefix = text.casefold()
+                start = end = bisect.bisect_left(self.keys, prefix)
+                while end < len(self.keys) and self.keys[end].startswith(prefix):
+                    end += 1
+                self.matches = self.sorted_songs[start:end]
             else:
                 self.matches = self.songs[:]
 
@@ -77,24 +100,38 @@ class SongManager:
         """Initialize the song manager."""
         self.base_dir = base_dir
         self.tags_file = os.path.join(base_dir, "song_metadata.yml")
-        self.tags = self._load_tags()
+        # Parsed on first access, so showing the menu never waits on the YAML
+        self._tags = None
+        # Tab completion; matches are case-insensitive, so let readline merge them that way too
+        readline.parse_and_bind('tab: complete')
+        readline.parse_and_bind('set completion-ignore-case on')
+        
+    @property
+    def tags(self) -> Dict:
+        """Song metadata, loaded from tags_file the first time it is needed."""
+        if self._tags is None:
+            self._tags = self._load_tags()
+        return self._tags
         
     def _load_tags(self) -> Dict:
         """Load song metadata from file."""
         try:
-            with open(self.tags_file, "r") as f:
-                return yaml.safe_load(f)
+            with open(self.tags_file, "r", encoding="utf-8") as f:
+                return yaml.load(f, Loader=SafeLoader)
         except FileNotFoundError:
             return {"songs": {}}
             
     def _save_tags(self) -> None:
         """Save song metadata to file."""
-        with open(self.tags_file, "w") as f:
-            yaml.dump(self.tags, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        # Write a temp file and swap it in so readers never see a half-written file
+        tmp_file = f"{self.tags_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            yaml.dump(self.tags, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+        os.replace(tmp_file, self.tags_file)
             
     def _get_song_list(self) -> List[str]:
         """Get a list of all songs."""
-        return list(self.tags["songs"].keys())
+        return list(self.tags["songs"])
         
     def _get_song_data(self, song_key: str) -> Dict:
         """Get data for a specific song."""
@@ -114,38 +151,40 @@ class SongManager:
         print("5. Rename song")
         print("6. Exit")
         
-    def _get_choice(self, prompt: str, choices: List[str]) -> str:
+    def _get_choice(self, prompt: str, choices: Sequence[str]) -> str:
         """Get user choice from a list of options with autocomplete."""
-        while True:
-            print(f"\n{prompt}")
-            print("Type to autocomplete or enter a number:")
-            for i, choice in enumerate(choices, 1):
-                print(f"{i}. {choice}")
-            
-            try:
-                # Set up readline completer
-                completer = SimpleCompleter(choices)
-                readline.set_completer(completer.complete)
-                readline.parse_and_bind('tab: complete')
-                
-                # Get input
-                choice = input("Enter choice (number or type to autocomplete): ").strip()
-                
-                # Try to convert to number first
+        # Set up readline completer once for this prompt; key bindings are set in __init__
+        completer = SimpleCompleter(choices)
+        readline.set_completer(completer.complete)
+        # The numbered list is shown once; retries only repeat the input prompt
+        print(f"\n{prompt}")
+        print("Type to autocomplete or enter a number:")
+        for i, choice in enumerate(choices, 1):
+            print(f"{i}. {choice}")
+        try:
+            while True:
                 try:
-                    choice_num = int(choice)
-                    if 1 <= choice_num <= len(choices):
-                        return choices[choice_num - 1]
-                except ValueError:
-                    # If not a number, check if it's a complete song title
-                    if choice in choices:
-                        return choice
+                    # Get input
+                    choice = input("Enter choice (number or type to autocomplete): ").strip()
                     
-                    # If not found, show error
-                    print("Invalid choice. Please try again.")
-            except EOFError:
-                print("\nExiting...")
-                sys.exit(0)
+                    # Try to convert to number first
+                    try:
+                        choice_num = int(choice)
+                        if 1 <= choice_num <= len(choices):
+                            return choices[choice_num - 1]
+                        print(f"Invalid choice. Enter a number from 1 to {len(choices)}.")
+                    except ValueError:
+                        # If not a number, check if it's a complete song title
+                        if choice in choices:
+                            return choice
+                        
+                        # If not found, show error
+                        print("Invalid choice. Please try again.")
+                except EOFError:
+                    print("\nExiting...")
+                    sys.exit(0)
+        finally:
+            readline.set_completer(None)
                 
     def _get_song_key(self, prompt: str) -> str:
         """Get a normalized song key from user input."""
@@ -188,13 +227,12 @@ class SongManager:
             add_tag = input("Add another tag? (y/n): ").lower()
             
         # Get status
-        valid_statuses = ["released", "deferred", "in_progress", "draft"]
         if "status" in existing_data:
             default_status = existing_data["status"]
         else:
             default_status = "deferred"
             
-        status = self._get_choice("\nSelect status", valid_statuses)
+        status = self._get_choice("\nSelect status", VALID_STATUSES)
         metadata["status"] = status
         
         # Get notes
@@ -241,7 +279,7 @@ class SongManager:
         
         # Create lyrics file
         lyrics_file = os.path.join(folder_path, f"{song_key}_lyrics.txt")
-        with open(lyrics_file, "w") as f:
+        with open(lyrics_file, "w", encoding="utf-8", newline="\n") as f:
             f.write(f"{title}\n\n")  # Write the original title as the first line
         logging.info(f"Created lyrics file: {lyrics_file}")
         
@@ -254,23 +292,23 @@ class SongManager:
         
     def list_songs(self) -> None:
         """List all songs with their metadata."""
-        print("\nAll Songs:")
-        for song_key in self._get_song_list():
-            data = self._get_song_data(song_key)
-            print(f"\n{song_key}")
-            print(f"Actual Title: {data.get('actual_title', 'N/A')}")
-            print(f"Status: {data.get('status', 'N/A')}")
-            print(f"Tags: {', '.join(data.get('tags', []))}")
-            print(f"Notes: {', '.join(data.get('notes', []))}")
+        lines = ["\nAll Songs:"]
+        for song_key, data in self.tags["songs"].items():
+            lines.append(f"\n{song_key}\n"
+                         f"Actual Title: {data.get('actual_title', 'N/A')}\n"
+                         f"Status: {data.get('status', 'N/A')}\n"
+                         f"Tags: {', '.join(data.get('tags', []))}\n"
+                         f"Notes: {', '.join(data.get('notes', []))}")
+        # Write the whole report at once instead of five print calls per song
+        sys.stdout.write("\n".join(lines) + "\n")
             
     def update_song(self) -> None:
         """Update an existing song's metadata."""
-        songs = self._get_song_list()
-        if not songs:
+        if not self.tags["songs"]:
             print("\nNo songs found!")
             return
             
-        song_key = self._get_choice("\nSelect song to update", songs)
+        song_key = self._get_choice("\nSelect song to update", self._get_song_list())
         existing_data = self._get_song_data(song_key)
         
         print("\nCurrent Metadata:")
@@ -288,12 +326,11 @@ class SongManager:
         
     def delete_song(self) -> None:
         """Delete an existing song."""
-        songs = self._get_song_list()
-        if not songs:
+        if not self.tags["songs"]:
             print("\nNo songs found!")
             return
             
-        song_key = self._get_choice("\nSelect song to delete", songs)
+        song_key = self._get_choice("\nSelect song to delete", self._get_song_list())
         
         confirm = input(f"\nAre you sure you want to delete '{song_key}'? (y/n): ").lower()
         if confirm == 'y':
@@ -311,12 +348,11 @@ class SongManager:
         
     def rename_song(self) -> None:
         """Rename an existing song."""
-        songs = self._get_song_list()
-        if not songs:
+        if not self.tags["songs"]:
             print("\nNo songs found!")
             return
             
-        old_key = self._get_choice("\nSelect song to rename", songs)
+        old_key = self._get_choice("\nSelect song to rename", self._get_song_list())
         new_key = self._get_song_key("Enter new song title")
         
         if new_key in self.tags["songs"]:
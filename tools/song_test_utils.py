@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Fixtures shared by the tools/test_*.py suites."""
+import os
+import shutil
+import tempfile
+import unittest
+
+class LyricsTreeTestCase(unittest.TestCase):
+    """Test case with a temporary song tree seeded with one lyrics file per title in SONGS."""
+    SONGS = ("hey-dad", "hey-son")
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir)
+        self.lyrics_files = {title: self.write_lyrics(title, f"{title} verse\n") for title in self.SONGS}
+
+    def write_lyrics(self, title, text, parent=""):
+        folder = os.path.join(self.base_dir, parent, title)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{title}_lyrics.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def assertRerunSkipsWrite(self, run, output_file):
+        """Run twice and check the second run left output_file's inode and mtime alone."""
+        run()
+        stamp = file_stamp(output_file)
+        run()
+        self.assertEqual(file_stamp(output_file), stamp)
+
+def file_stamp(path):
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yaml
+from consolidate_songs import consolidate_songs, get_index_file, load_song_index
+from lyrics_scan import CONSOLIDATED_LYRICS_NAME, LYRICS_SUFFIX, SKIP_DIRS, scan_lyrics_files
+from song_test_utils import LyricsTreeTestCase, file_stamp
+
+def sequential_walk(path):
+    """Reference depth-first scan, one directory at a time in os.scandir order."""
+    with os.scandir(path) as it:
+        entries = list(it)
+    for entry in entries:
+        name = entry.name.lower()
+        if entry.is_dir():
+            if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                yield from sequential_walk(entry.path)
+        elif name.endswith(LYRICS_SUFFIX) and name != CONSOLIDATED_LYRICS_NAME:
+            yield entry.path
+
+class TestConsolidateSongs(LyricsTreeTestCase):
+    def setUp(self):
+        super().setUp()
+        # Keep the output (and its index/backup) out of the scanned tree
+        self.out_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.out_dir)
+        self.output_file = os.path.join(self.out_dir, "consolidated_songs.yml")
+
+    def consolidate(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            consolidate_songs(self.base_dir, self.output_file)
+        with open(self.output_file, encoding="utf-8") as f:
+            return yaml.safe_load(f)["songs"]
+
+    def test_noop_rerun_skips_write(self):
+        """Test that a rerun with nothing changed leaves the output untouched"""
+        self.assertRerunSkipsWrite(self.consolidate, self.output_file)
+        self.assertFalse(os.path.exists(f"{self.output_file}.bak"))
+
+    def test_deleted_song_invalidates_index(self):
+        """Test that removing a song's folder rewrites the output without it"""
+        self.consolidate()
+        shutil.rmtree(os.path.join(self.base_dir, "hey-son"))
+        songs = self.consolidate()
+        self.assertEqual([song["title"] for song in songs], ["hey-dad"])
+        self.assertEqual(list(load_song_index(get_index_file(self.output_file))["songs"]), ["hey-dad"])
+        self.assertTrue(os.path.exists(f"{self.output_file}.bak"))
+
+    def test_whitespace_only_change_does_not_rewrite(self):
+        """Test that surrounding whitespace edits refresh the index but not the output"""
+        self.consolidate()
+        stamp = file_stamp(self.output_file)
+        fingerprint = load_song_index(get_index_file(self.output_file))["fingerprint"]
+        self.write_lyrics("hey-dad", "\nhey-dad verse\n\n  \n")
+        self.consolidate()
+        self.assertEqual(file_stamp(self.output_file), stamp)
+        self.assertFalse(os.path.exists(f"{self.output_file}.bak"))
+        self.assertNotEqual(load_song_index(get_index_file(self.output_file))["fingerprint"], fingerprint)
+
+    def test_scan_order_matches_sequential_walk(self):
+        """Test that the parallel scan yields files in sequential depth-first order"""
+        for parent in ("album-b", "album-a", os.path.join("album-a", "disc-2"), "Spanglish"):
+            for title in ("ikigai", "papa", "pockets"):
+                self.write_lyrics(title, f"{parent} {title}\n", parent=parent)
+        self.write_lyrics("hidden", "skipped\n", parent=".git")
+        self.assertEqual(list(scan_lyrics_files(self.base_dir)), list(sequential_walk(self.base_dir)))
+
+    def test_duplicate_title_keeps_first_in_scan_order(self):
+        """Test that a duplicated title keeps the lyrics of the file scanned first"""
+        for parent in ("album-b", "album-a"):
+            self.write_lyrics("papa", f"{parent} papa\n", parent=parent)
+        first = next(path for path in sequential_walk(self.base_dir) if path.endswith("papa_lyrics.txt"))
+        with open(first, encoding="utf-8") as f:
+            expected = f.read().strip()
+        songs = {song["title"]: song["lyrics"] for song in self.consolidate()}
+        self.assertEqual(songs["papa"], expected)
+
+if __name__ == '__main__':
+    unittest.main()
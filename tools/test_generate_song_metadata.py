@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_song_metadata
+from generate_song_metadata import SIMHASH_MAX_DISTANCE, compare_tags, dump_tags, has_lyrics, load_yaml, simhash, update_song_metadata
+from song_test_utils import LyricsTreeTestCase
+
+def _tags(*titles):
+    return {"songs": {title: {} for title in titles}}
+
+class TestPossibleRenames(unittest.TestCase):
+    def test_near_duplicate_titles_match(self):
+        """Test that case changes and small title edits are flagged as renames"""
+        for old, new in [("memorabilia", "Memorabilia"),
+                         ("the-journey-to-myself", "journey-to-myself"),
+                         ("open-your-heart", "open-your-heart-album")]:
+            result = compare_tags(_tags(old), _tags(new))
+            self.assertEqual(result["possible_renames"], [(old, new)])
+
+    def test_distinct_titles_do_not_match(self):
+        """Test that different songs sharing a word are not flagged as renames"""
+        for old, new in [("hey-dad", "hey-son"),
+                         ("flickering-candle", "flickering-light"),
+                         ("ikigai", "papa")]:
+            result = compare_tags(_tags(old), _tags(new))
+            self.assertEqual(result["possible_renames"], [])
+
+    def test_threshold(self):
+        """Test the distance bounds the threshold is tuned between"""
+        distance = lambda a, b: bin(simhash(a) ^ simhash(b)).count("1")
+        self.assertLess(distance("open-your-heart", "open-your-heart-album"), SIMHASH_MAX_DISTANCE)
+        self.assertGreaterEqual(distance("flickering-candle", "flickering-light"), SIMHASH_MAX_DISTANCE)
+
+class TestUpdateSongMetadata(LyricsTreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.output_file = os.path.join(self.base_dir, "song_metadata.yml")
+
+    def test_noop_rerun_skips_write(self):
+        """Test that a rerun with the same songs leaves the metadata file untouched"""
+        self.assertRerunSkipsWrite(lambda: update_song_metadata(self.base_dir, self.output_file), self.output_file)
+
+    def test_load_yaml_returns_private_copies(self):
+        """Test that mutating a loaded document doesn't leak into the next load"""
+        update_song_metadata(self.base_dir, self.output_file)
+        load_yaml(self.output_file)["songs"].clear()
+        self.assertEqual(sorted(load_yaml(self.output_file)["songs"]), ["hey-dad", "hey-son"])
+
+    def test_has_lyrics_rereads_changed_file(self):
+        """Test that the lyrics stat cache notices a file being emptied"""
+        self.assertTrue(has_lyrics(self.lyrics_files["hey-son"]))
+        self.write_lyrics("hey-son", "")
+        self.assertFalse(has_lyrics(self.lyrics_files["hey-son"]))
+
+    def test_dump_tags_keeps_previous_file_as_backup(self):
+        """Test that a rewrite leaves the old contents in the backup and the new ones in place"""
+        backup_file = f"{self.output_file}.bak"
+        dump_tags(_tags("hey-dad"), self.output_file)
+        self.assertTrue(dump_tags(_tags("hey-son"), self.output_file, backup_file))
+        self.assertEqual(list(load_yaml(backup_file)["songs"]), ["hey-dad"])
+        self.assertEqual(list(load_yaml(self.output_file)["songs"]), ["hey-son"])
+        self.assertFalse(os.path.exists(f"{self.output_file}.tmp"))
+
+    def test_deleted_song_leaves_lyrics_cache(self):
+        """Test that a rerun drops cache entries for lyrics files that no longer exist"""
+        update_song_metadata(self.base_dir, self.output_file)
+        shutil.rmtree(os.path.join(self.base_dir, "hey-son"))
+        update_song_metadata(self.base_dir, self.output_file)
+        self.assertNotIn(self.lyrics_files["hey-son"], generate_song_metadata._lyrics_file_cache)
+
+if __name__ == '__main__':
+    unittest.main()
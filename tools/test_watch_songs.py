@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import watch_songs
+    from watchdog.events import FileDeletedEvent, FileMovedEvent, FileModifiedEvent
+except ImportError:
+    watch_songs = None
+
+@unittest.skipIf(watch_songs is None, "watchdog is not installed")
+class TestSongFolderHandlerDispatch(unittest.TestCase):
+    def setUp(self):
+        self.handler = watch_songs.SongFolderHandler('.')
+        self.addCleanup(self.handler.close)
+        patcher = mock.patch.object(self.handler, 'process_folder')
+        self.process_folder = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rename_from_hidden_temp_file_onto_lyrics(self):
+        """Test that a save by renaming a hidden temp file onto the lyrics file schedules a rebuild"""
+        self.handler.dispatch(FileMovedEvent('./hey-son/.goutputstream-ABC123', './hey-son/hey-son_lyrics.txt'))
+        self.process_folder.assert_called_once()
+
+    def test_rename_from_temp_or_backup_file_onto_lyrics(self):
+        """Test that atomic saves from .tmp and ~ files schedule a rebuild"""
+        self.handler.dispatch(FileMovedEvent('./x/x_lyrics.txt.tmp', './x/x_lyrics.txt'))
+        self.handler.dispatch(FileMovedEvent('./x/x_lyrics.txt~', './x/x_lyrics.txt'))
+        self.assertEqual(self.process_folder.call_count, 2)
+
+    def test_ignored_paths(self):
+        """Test that events landing on ignored paths never reach the handlers"""
+        self.handler.dispatch(FileModifiedEvent('./.git/hey-son_lyrics.txt'))
+        self.handler.dispatch(FileMovedEvent('./hey-son/hey-son_lyrics.txt', './hey-son/hey-son_lyrics.txt~'))
+        self.process_folder.assert_not_called()
+
+    def test_modify_after_atomic_save_compares_against_saved_content(self):
+        """Test that an in-place write after a rename-save is judged against the renamed-in content"""
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        path = os.path.join(base_dir, 'x_lyrics.txt')
+        def write(target, text):
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(text)
+        write(path, 'A2')
+        self.handler.dispatch(FileModifiedEvent(path))
+        write(f'{path}.tmp', 'B')
+        os.replace(f'{path}.tmp', path)
+        self.handler.dispatch(FileMovedEvent(f'{path}.tmp', path))
+        write(path, 'A2')
+        self.handler.dispatch(FileModifiedEvent(path))
+        self.assertEqual(self.process_folder.call_count, 3)
+
+    def test_delete_forgets_digest(self):
+        """Test that a deleted lyrics file's digest is dropped so its next content counts as a change"""
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        path = os.path.join(base_dir, 'x_lyrics.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('A')
+        self.handler.dispatch(FileModifiedEvent(path))
+        os.remove(path)
+        self.handler.dispatch(FileDeletedEvent(path))
+        self.assertNotIn(path, self.handler._content_digests)
+
+if __name__ == '__main__':
+    unittest.main()
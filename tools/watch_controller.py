@@ -4,10 +4,13 @@ import signal
 import sys
 import time
 
+# Where the running watcher's PID is recorded
+PID_FILE = os.path.expanduser("~/Library/Application Support/Songs/watch.pid")
+
 class WatchService:
     def __init__(self):
         self.process = None
-        self.pid_file = os.path.expanduser("~/Library/Application Support/Songs/watch.pid")
+        self.pid_file = PID_FILE
 
     def start(self):
         """Start the watch service"""
@@ -41,8 +44,10 @@ class WatchService:
             # Send SIGTERM to the process
             os.kill(pid, signal.SIGTERM)
             
-            # Wait for process to terminate
-            time.sleep(1)
+            # Wait for process to terminate, polling so a quick exit returns right away
+            if not self._wait_for_exit(pid):
+                # Still alive after the grace period, force it
+                os.kill(pid, signal.SIGKILL)
             
             # Remove PID file
             os.remove(self.pid_file)
@@ -51,6 +56,17 @@ class WatchService:
         except Exception as e:
             print(f"Error stopping watch service: {str(e)}")
 
+    def _wait_for_exit(self, pid, timeout=5.0, interval=0.1):
+        """Poll until pid exits; return False if it is still running after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            try:
+                os.kill(pid, 0)
+            except OSError:
+                return True
+        return False
+
     def is_running(self):
         """Check if the service is running"""
         if not os.path.exists(self.pid_file):
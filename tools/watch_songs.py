@@ -1,59 +1,145 @@
 import os
 import sys
+import hashlib
+import re
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import time
-import subprocess
+import threading
 import logging
+import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('watcher.log'),
-        logging.StreamHandler()
-    ]
-)
+from build_all import build
+from log_setup import setup_queue_logging
+from lyrics_scan import LYRICS_SUFFIX
+from watch_controller import PID_FILE
+
+# Seconds of quiet required before a burst of events triggers one rebuild
+DEBOUNCE_SECONDS = 1.5
+
+# Paths whose events are dropped before reaching the on_* handlers: hidden entries
+# (.git, .DS_Store, ...), bytecode caches, editor swap/backup files, and the files the
+# builders and this watcher write themselves, which would otherwise retrigger a rebuild.
+# A move is judged by its destination only, since editors save by renaming a hidden or
+# temporary file onto the real one
+IGNORE_REGEXES = [
+    r'.*/\.[^/]*(/.*)?$',
+    r'.*/__pycache__(/.*)?$',
+    r'.*(~|\.swp|\.swx|\.tmp)$',
+    r'.*\.log$',
+    r'.*\.ya?ml(\.tmp|\.bak)?$',
+    r'.*\.index\.json$',
+]
+
+IGNORE_RE = re.compile('|'.join(f'(?:{regex})' for regex in IGNORE_REGEXES), re.IGNORECASE)
 
 class SongFolderHandler(FileSystemEventHandler):
     def __init__(self, base_dir):
         # Use the absolute path of the base directory passed in
         self.base_dir = os.path.abspath(base_dir)
-        self.last_update = time.time()
+        # Output files live next to the scripts
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.consolidated_file = os.path.join(script_dir, 'consolidated_songs.yml')
+        self.metadata_file = os.path.join(script_dir, 'song_metadata.yml')
+        # Parsed metadata with folder renames applied in memory; written out before the next rebuild
+        self._metadata = None
+        self._metadata_dirty = False
+        self._metadata_lock = threading.Lock()
+        # Content digest of each lyrics file as of the last event that scheduled a rebuild for it
+        self._content_digests = {}
+        # Folders touched since the last rebuild; a single worker thread drains them once
+        # no event has arrived for DEBOUNCE_SECONDS
+        self._pending_folders = set()
+        self._last_event = 0.0
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._worker = threading.Thread(target=self._rebuild_loop, name="song-rebuild", daemon=True)
+        self._worker.start()
+        
+    def dispatch(self, event):
+        # The builders only read folder names and lyrics files, so other file events
+        # (audio, images, notes) can't change their output
+        if not event.is_directory and not any(
+                path.lower().endswith(LYRICS_SUFFIX) for path in (event.src_path, getattr(event, 'dest_path', ''))):
+            return
+        if IGNORE_RE.match(getattr(event, 'dest_path', '') or event.src_path):
+            return
+        super().dispatch(event)
+        
+    def process_folder(self, *folder_names):
+        """Mark folder_names dirty; they are rebuilt together once events stop arriving."""
+        with self._pending_lock:
+            self._pending_folders.update(folder_names)
+            self._last_event = time.monotonic()
+        self._wake.set()
+        
+    def close(self):
+        """Run any pending rebuild, then stop the worker thread."""
+        self._closing = True
+        self._wake.set()
+        self._worker.join()
         
-    def process_folder(self, folder_name):
+    def _rebuild_loop(self):
+        while True:
+            self._wake.wait()
+            # Debounce: keep sleeping until the burst has been quiet for DEBOUNCE_SECONDS
+            while not self._closing:
+                with self._pending_lock:
+                    remaining = self._last_event + DEBOUNCE_SECONDS - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(remaining)
+            with self._pending_lock:
+                self._wake.clear()
+                folders, self._pending_folders = self._pending_folders, set()
+            if folders:
+                self._run_builders(folders)
+            if self._closing:
+                return
+        
+    def _run_builders(self, folders):
         try:
-            logging.info(f"Processing folder: {folder_name}")
-            
-            # Get absolute paths for scripts and output files
-            script_dir = os.path.dirname(os.path.abspath(__file__))
+            logging.info(f"Processing folders: {', '.join(sorted(folders))}")
             
-            # Run consolidate_songs.py
-            subprocess.run(
-                ['python', os.path.join(script_dir, 'consolidate_songs.py'), 
-                 '--base-dir', self.base_dir, 
-                 '--output', os.path.join(script_dir, 'consolidated_songs.yml')],
-                check=True
-            )
+            # The builders read song_metadata.yml, so pending renames must land first
+            self._flush_metadata()
             
-            # Run generate_song_metadata.py
-            subprocess.run(
-                ['python', os.path.join(script_dir, 'generate_song_metadata.py'), 
-                 '--base-dir', self.base_dir, 
-                 '--output', os.path.join(script_dir, 'song_metadata.yml')],
-                check=True
-            )
+            # Run both builders in this process over one scan instead of spawning an interpreter each
+            build(self.base_dir, self.consolidated_file, self.metadata_file)
             
             logging.info("Both files updated successfully!")
         except Exception as e:
             logging.error(f"Error processing folder: {e}")
 
+    def _cached_metadata(self):
+        """Return the parsed metadata, loading it on first use (None if there is no file)."""
+        if self._metadata is None and os.path.exists(self.metadata_file):
+            with open(self.metadata_file, "r", encoding='utf-8') as f:
+                self._metadata = yaml.load(f, Loader=SafeLoader)
+        return self._metadata
+
+    def _flush_metadata(self):
+        """Write pending renames atomically, then drop the cache since the builders rewrite the file."""
+        with self._metadata_lock:
+            if self._metadata_dirty:
+                tmp_file = f"{self.metadata_file}.tmp"
+                with open(tmp_file, "w", encoding='utf-8') as f:
+                    yaml.dump(self._metadata, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+                os.replace(tmp_file, self.metadata_file)
+                self._metadata_dirty = False
+            self._metadata = None
+
     def on_created(self, event):
         if event.is_directory:
             folder_name = os.path.basename(event.src_path)
         else:
             folder_name = '.'  # Root directory
+            self._content_changed(event.src_path)
         self.process_folder(folder_name)
 
     def on_deleted(self, event):
@@ -61,6 +147,7 @@ class SongFolderHandler(FileSystemEventHandler):
             folder_name = os.path.basename(event.src_path)
         else:
             folder_name = '.'  # Root directory
+        self._forget_content(event.src_path)
         self.process_folder(folder_name)
 
     def on_moved(self, event):
@@ -71,17 +158,20 @@ class SongFolderHandler(FileSystemEventHandler):
             old_folder = '.'  # Root directory
             new_folder = '.'  # Root directory
         
-        # Update metadata if this is a folder rename
-        metadata_file = "song_metadata.yml"
-        if os.path.exists(metadata_file):
-            try:
-                with open(metadata_file, "r", encoding='utf-8') as f:
-                    metadata = yaml.safe_load(f)
+        # The destination now holds the moved content (e.g. an editor's atomic save)
+        self._forget_content(event.src_path)
+        if not event.is_directory:
+            self._content_changed(event.dest_path)
+        
+        # Update metadata if this is a folder rename; the write is deferred to the next rebuild
+        # so a burst of renames costs one dump instead of one per event
+        try:
+            with self._metadata_lock:
+                metadata = self._cached_metadata()
                 
                 # Update folder name in metadata
-                if old_folder in metadata.get("songs", {}):
-                    song_data = metadata["songs"][old_folder]
-                    del metadata["songs"][old_folder]
+                if metadata and old_folder in metadata.get("songs", {}):
+                    song_data = metadata["songs"].pop(old_folder)
                     metadata["songs"][new_folder] = song_data
                     
                     # Update the lyrics file name in metadata
@@ -91,23 +181,43 @@ class SongFolderHandler(FileSystemEventHandler):
                         new_lyrics_name = old_lyrics_name.replace(f"{old_folder}_", f"{new_folder}_")
                         song_data["original_lyrics_name"] = new_lyrics_name
                     
-                    # Save updated metadata
-                    with open(metadata_file, "w", encoding='utf-8') as f:
-                        yaml.dump(metadata, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
-            except Exception as e:
-                logging.error(f"Error updating metadata for folder rename: {str(e)}")
+                    self._metadata_dirty = True
+        except Exception as e:
+            logging.error(f"Error updating metadata for folder rename: {str(e)}")
         
-        # Process the new folder
-        self.process_folder(new_folder)
+        # Process both sides of the rename as one dirty batch
+        self.process_folder(old_folder, new_folder)
+
+    def _content_changed(self, path):
+        """Return whether path's content differs from the last time it was seen here."""
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+        except OSError:
+            self._content_digests.pop(path, None)
+            return True
+        if self._content_digests.get(path) == digest:
+            return False
+        self._content_digests[path] = digest
+        return True
+
+    def _forget_content(self, path):
+        """Drop the digests recorded for path and, if it was a directory, everything under it."""
+        self._content_digests.pop(path, None)
+        prefix = path + os.sep
+        for stale in [p for p in self._content_digests if p.startswith(prefix)]:
+            del self._content_digests[stale]
 
     def on_modified(self, event):
-        # Only process if enough time has passed since last update
-        current_time = time.time()
-        if current_time - self.last_update > 2:  # 2 seconds delay
-            folder_name = '.'  # Root directory
-            self.process_folder(folder_name)
-            self.last_update = current_time
-            return  # Add return to prevent further processing
+        # A directory's mtime bumps whenever an entry inside it changes; that entry's own event covers it
+        if event.is_directory:
+            return
+        # A touch or a save without edits can't change the builders' output
+        if not self._content_changed(event.src_path):
+            return
+        # Bursts of modifications are coalesced by the rebuild worker's debounce
+        folder_name = '.'  # Root directory
+        self.process_folder(folder_name)
 
 def start_watcher():
     event_handler = SongFolderHandler('.')
@@ -116,11 +226,12 @@ def start_watcher():
     observer.start()
     
     try:
-        while True:
-            time.sleep(1)
+        # Block until Ctrl-C (or the observer dying) instead of waking up every second
+        observer.join()
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    event_handler.close()
 
 def stop_watcher():
     import psutil
@@ -128,9 +239,22 @@ def stop_watcher():
     
     print("Stopping song folder watcher...")
     
-    # Find and terminate the watcher process
-    for proc in psutil.process_iter(['name']):
-        if proc.info['name'] == 'python' and any('watch_songs.py' in arg for arg in proc.cmdline()):
+    # Fast path: the PID recorded by watch_controller, if it still belongs to a watcher
+    try:
+        with open(PID_FILE, 'r') as f:
+            proc = psutil.Process(int(f.read().strip()))
+        if any('watch_songs.py' in arg for arg in proc.cmdline()):
+            proc.send_signal(signal.SIGINT)
+            print(f"Stopped process: {proc.pid}")
+            return
+    except (OSError, ValueError, psutil.Error):
+        pass
+    
+    # Otherwise find and terminate the watcher process; cmdline is fetched along with name
+    for proc in psutil.process_iter(['name', 'cmdline']):
+        # Match python, python3, python3.12, Python (macOS), ...; the cmdline test only runs for those
+        name = proc.info['name'] or ''
+        if name.lower().startswith('python') and any('watch_songs.py' in arg for arg in proc.info['cmdline'] or ()):
             try:
                 proc.send_signal(signal.SIGINT)
                 print(f"Stopped process: {proc.pid}")
@@ -144,6 +268,7 @@ def main():
     
     command = sys.argv[1]
     if command == "start":
+        setup_queue_logging('watcher.log', fmt='%(asctime)s - %(levelname)s - %(message)s')
         start_watcher()
     elif command == "stop":
         stop_watcher()
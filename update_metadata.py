@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 from typing import Dict
 import os
+import shutil
 
 def update_metadata():
     # Load existing metadata
     metadata_file = "song_metadata.yml"
     with open(metadata_file, "r") as f:
-        metadata = yaml.safe_load(f)
+        metadata = yaml.load(f, Loader=SafeLoader)
         
     # Add Flickering Candle metadata
     flickering_candle_data = {
@@ -21,13 +26,20 @@ def update_metadata():
     # Update metadata
     metadata["songs"]["flickering-candle"] = flickering_candle_data
     
-    # Backup existing file
+    # Backup existing file; a hardlink keeps the old contents once the new file replaces it
     backup_file = metadata_file + ".bak"
-    os.replace(metadata_file, backup_file)
+    if os.path.exists(backup_file):
+        os.remove(backup_file)
+    try:
+        os.link(metadata_file, backup_file)
+    except OSError:
+        shutil.copy2(metadata_file, backup_file)
     
-    # Save updated metadata
-    with open(metadata_file, "w") as f:
-        yaml.dump(metadata, f, default_flow_style=False)
+    # Save updated metadata to a temp file and swap it in, so the file never goes missing
+    tmp_file = metadata_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        yaml.dump(metadata, f, Dumper=SafeDumper, default_flow_style=False)
+    os.replace(tmp_file, metadata_file)
     
     print(f"Updated {metadata_file} with Flickering Candle metadata")
     print(f"Backup created at {backup_file}")